@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 import argparse
 from aoc_util import dbg
-from intcode import IntcodeVM
+from intcode import IntcodeVM, MemoryEquals, search
+from intcode_symbolic import SymbolicException, solve
 
-def problem(input_file, part2=False):
+def problem(input_file, part2=False, batch=False):
     if not part2:
         vm = IntcodeVM.from_file(input_file)
         vm.dbg = dbg.debug_level
@@ -15,28 +16,37 @@ def problem(input_file, part2=False):
         return vm.memory.get(0)
 
     target = 19690720
-    for noun in range(100):
-        for verb in range(100):
-            vm = IntcodeVM.from_file(input_file)
-            print(f"Trying {noun = }; {verb = };")
-            vm.dbg = dbg.debug_level
-            vm.memory.set(1, noun)
-            vm.memory.set(2, verb)
-            vm.core_dump_enabled = False
-            vm.run()
-            if vm.memory.get(0) == target:
+    program = IntcodeVM.from_file(input_file)
+    if batch:
+        # Imported here so numpy is only needed with --batch
+        from intcode_batch import BatchVM
+        sweep = BatchVM.sweep(program, {1: range(100), 2: range(100)})
+        sweep.run()
+        for index, value in enumerate(sweep.get(0)):
+            if value == target and index not in sweep.errors:
+                noun, verb = divmod(index, 100)
                 return 100 * noun + verb
-    return None
+        return None
+
+    try:
+        patch = solve(program, {1: range(100), 2: range(100)}, 0, target)
+    except SymbolicException as e:
+        dbg.print(f"Falling back to trying every noun/verb: {e}")
+        patch = search(program, {1: range(100), 2: range(100)}, MemoryEquals(0, target))
+    if patch is None:
+        return None
+    return 100 * patch[1] + patch[2]
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('filename', nargs='?', default='input.txt')
     parser.add_argument('-v', '--verbose', action='count', default=0)
+    parser.add_argument('-b', '--batch', action='store_true', help="Run every noun/verb together with numpy")
     args = parser.parse_args()
     dbg.set_level(args.verbose)
 
     print(problem(args.filename))
-    print(problem(args.filename, part2=True))
+    print(problem(args.filename, part2=True, batch=args.batch))
     print(f"{dbg.debug_level = }")
 
@@ -1,7 +1,14 @@
+import concurrent.futures
+import copy
+import array
+import asyncio
 import enum
+import multiprocessing
 from collections import defaultdict
 import itertools
 import sys
+import time
+from aoc_util import parse_file
 
 if not hasattr(itertools, 'batched'):
     itertools.batched = lambda iterable, batch_size: zip(*(iterable[i::batch_size] for i in range(batch_size)))
@@ -16,23 +23,77 @@ class OutOfBoundsException(IntcodeException):
 class InvalidOpcode(IntcodeException):
     pass
 
+class InputStarved(IntcodeException):
+    pass
+
+class Deadlock(IntcodeException):
+    pass
+
+
+# Longest instruction is an opcode and three parameters
+MAX_INSTRUCTION_SIZE = 4
+
+
+POSITION = 0
+IMMEDIATE = 1
+RELATIVE = 2
+
+
+def parameter_modes(op, full_opcode):
+    modes = full_opcode // 100
+    result = []
+    for i in range(op.param_count):
+        modes, mode = divmod(modes, 10)
+        if mode not in (POSITION, IMMEDIATE, RELATIVE):
+            raise InvalidOpcode(f"Invalid parameter mode {mode} in {full_opcode}")
+        if i >= op.potential_indirects and mode != RELATIVE:
+            # Parameters that are written to are addresses, used as-is unless they're relative
+            mode = IMMEDIATE
+        result.append(mode)
+    return result
+
 
 class Instruction:
     def __init__(self, memory, pc):
         full_opcode = memory.get(pc)
+        self.pc = pc
         self.op = Opcode.from_code(full_opcode % 100)
-        self.is_immediate = [full_opcode % (10**(x+3)) // (10**(x+2)) for x in range(self.op.potential_indirects)]
-        self.is_immediate.extend([True] * (self.op.param_count-self.op.potential_indirects))
-        self.parameters = [memory.get(pc+i) for i in range(1,self.op.param_count+1)]
+        self.modes = parameter_modes(self.op, full_opcode)
+        self.parameters = tuple(memory.get(pc+i) for i in range(1,self.op.param_count+1))
+        self.size = self.op.param_count + 1
+        # Everything the run loop needs, so it doesn't have to look at the Opcode or the modes again.
+        # Relative parameters get the relative base added, then indirect parameters are read from memory.
+        self.relative = tuple(i for i,mode in enumerate(self.modes) if mode == RELATIVE)
+        self.indirect = tuple(i for i,mode in enumerate(self.modes) if mode != IMMEDIATE and i < self.op.potential_indirects)
+        self.decoded = (self.op.function, self.parameters, self.indirect, self.relative, self.size)
+
+    def resolve(self, machine):
+        parameters = list(self.parameters)
+        for i in self.relative:
+            parameters[i] += machine.relative_base
+        for i in self.indirect:
+            parameters[i] = machine.memory.get(parameters[i])
+        return parameters
 
     def execute(self, machine):
-        parameters = [param if immediate else machine.memory.get(addr=param) for param,immediate in zip(self.parameters, self.is_immediate)]
+        parameters = self.resolve(machine)
+        machine.pc = self.pc + self.size
         self.op.function(machine, parameters)
-        machine.pc += self.op.param_count+1
+
+    def source_parameter(self, i):
+        # Python expression for a parameter's value, for the compiler
+        param = self.parameters[i]
+        text = f'(vm.relative_base + {param})' if self.modes[i] == RELATIVE else str(param)
+        return f'get({text})' if i in self.indirect else text
+
+    def format_parameter(self, i):
+        param = self.parameters[i]
+        text = f'rb{param:+}' if self.modes[i] == RELATIVE else str(param)
+        return f'*{text}' if i in self.indirect else text
 
     def __str__(self):
         result = [self.op.name]
-        result.append(', '.join(f'{"" if immediate else "*"}{param}' for param,immediate in zip(self.parameters, self.is_immediate)))
+        result.append(', '.join(self.format_parameter(i) for i in range(len(self.parameters))))
         return " ".join(result)
 
 def nop(state):
@@ -41,12 +102,18 @@ def nop(state):
 
 class Opcode:
     opcodes = {}
-    def __init__(self, name, code, param_count=0, potential_indirects=0, function=nop):
+    def __init__(self, name, code, param_count=0, potential_indirects=0, function=nop, source=None, branch=None, ends_block=False):
         self.name = name
         self.code = code
         self.param_count = param_count
         self.potential_indirects = potential_indirects
         self.function = function
+        # Optional templates for the compiler, formatted with the parameter expressions. source is a
+        # statement doing what function does. branch is the condition for a jump to the last parameter.
+        # Opcodes with neither are compiled as a call to function.
+        self.source = source
+        self.branch = branch
+        self.ends_block = ends_block
         setattr(self.__class__, self.name, self)
         self.__class__.opcodes[self.code] = self
 
@@ -60,9 +127,31 @@ class Opcode:
         except KeyError:
             raise InvalidOpcode(f"Invalid opcode: {code}")
 
-Opcode("ADD", code=1, param_count=3, potential_indirects=2, function=lambda vm, params: vm.memory.set(params[2], params[0] + params[1]))
-Opcode("MUL", code=2, param_count=3, potential_indirects=2, function=lambda vm, params: vm.memory.set(params[2], params[0] * params[1]))
-Opcode("HALT", code=99, function=lambda vm, params: vm.halt())
+
+def jump(vm, condition, target):
+    if condition:
+        vm.pc = target
+
+def read(vm, params):
+    try:
+        value = vm.read_input()
+    except InputStarved:
+        # Put the pc back so the instruction runs again once there's input
+        vm.pc -= Opcode.IN.param_count + 1
+        raise
+    vm.memory.set(params[0], value)
+
+# Opcode functions are called with the pc already moved past the instruction, so jumps just overwrite it
+Opcode("ADD", code=1, param_count=3, potential_indirects=2, function=lambda vm, params: vm.memory.set(params[2], params[0] + params[1]), source="set({2}, {0} + {1})")
+Opcode("MUL", code=2, param_count=3, potential_indirects=2, function=lambda vm, params: vm.memory.set(params[2], params[0] * params[1]), source="set({2}, {0} * {1})")
+Opcode("IN", code=3, param_count=1, potential_indirects=0, function=read, source="set({0}, vm.read_input())")
+Opcode("OUT", code=4, param_count=1, potential_indirects=1, function=lambda vm, params: vm.write_output(params[0]), source="vm.write_output({0})")
+Opcode("JT", code=5, param_count=2, potential_indirects=2, function=lambda vm, params: jump(vm, params[0] != 0, params[1]), branch="{0} != 0")
+Opcode("JF", code=6, param_count=2, potential_indirects=2, function=lambda vm, params: jump(vm, params[0] == 0, params[1]), branch="{0} == 0")
+Opcode("LT", code=7, param_count=3, potential_indirects=2, function=lambda vm, params: vm.memory.set(params[2], int(params[0] < params[1])), source="set({2}, int({0} < {1}))")
+Opcode("EQ", code=8, param_count=3, potential_indirects=2, function=lambda vm, params: vm.memory.set(params[2], int(params[0] == params[1])), source="set({2}, int({0} == {1}))")
+Opcode("ARB", code=9, param_count=1, potential_indirects=1, function=lambda vm, params: setattr(vm, 'relative_base', vm.relative_base + params[0]), source="vm.relative_base += {0}")
+Opcode("HALT", code=99, function=lambda vm, params: vm.halt(), ends_block=True)
 
 #class Opcode(enum.Enum):
 #    ADD   = 1
@@ -72,74 +161,643 @@ Opcode("HALT", code=99, function=lambda vm, params: vm.halt())
 #    HALT  = 99
 
 class Memory:
+    # Addresses this far past the end of the dense region just extend it, anything further goes in the sparse dict
+    MAX_GROWTH = 4096
+    # Dense regions at least this big are kept in a 64 bit typed array, which takes 8 bytes a cell rather
+    # than a list's pointer plus int object. Reading from one makes a new int each time, which costs
+    # around 10% per tick, so smaller regions (every real program so far) stay as a plain list.
+    ARRAY_SIZE = 1 << 16
+
     def __init__(self, data):
-        self.data = data
+        self.data = self.dense(data)
+        self.sparse = {}
+        # Decoded instructions by pc, and the pcs of the decoded instructions each cell is part of.
+        # Writing to a cell throws away any decoded instruction that used it.
+        self.decoded = {}
+        self.code = {}
+        # Compiled blocks by the pc they start at. Their cells are in code as well, and writing to one
+        # sets code_written so the compiled code knows to stop.
+        self.compiled = {}
+        self.code_written = False
 
     def set(self, addr, value):
+        if addr < 0:
+            raise OutOfBoundsException(f"Write error: {addr} is out of bounds")
         try:
             self.data[addr] = value
         except IndexError:
-            raise OutOfBoundsException(f"Write error: {addr} is out of bounds")
+            if addr < len(self.data) + self.MAX_GROWTH:
+                self.grow(addr + 1)
+                # Again through set, in case the region is now an array the value doesn't fit in
+                self.set(addr, value)
+                return
+            else:
+                self.sparse[addr] = value
+        except OverflowError:
+            self.data = list(self.data)
+            self.data[addr] = value
+        if addr in self.code:
+            self.invalidate(addr)
 
     def get(self, addr):
         try:
-            return self.data[addr]
+            if addr >= 0:
+                return self.data[addr]
         except IndexError:
-            raise OutOfBoundsException(f"Read error: {addr} is out of bounds")
+            return self.sparse.get(addr, 0)
+        raise OutOfBoundsException(f"Read error: {addr} is out of bounds")
+
+    @classmethod
+    def dense(cls, data):
+        data = list(data)
+        if len(data) < cls.ARRAY_SIZE:
+            return data
+        try:
+            return array.array('q', data)
+        except OverflowError:
+            # Values too big for 64 bits have to stay as Python ints
+            return data
+
+    def grow(self, size):
+        # Double the dense region at least, so runs of writes just past the end don't keep copying
+        old_size = len(self.data)
+        size = max(size, 2 * old_size)
+        self.data.extend(itertools.repeat(0, size - old_size))
+        if isinstance(self.data, list) and size >= self.ARRAY_SIZE:
+            self.data = self.dense(self.data)
+        for addr in [addr for addr in self.sparse if addr < size]:
+            self.data[addr] = self.sparse.pop(addr)
+
+    def add_decoded(self, instruction):
+        self.decoded[instruction.pc] = instruction
+        # Tuples rather than sets so copies of this memory can share them
+        for addr in range(instruction.pc, instruction.pc + instruction.size):
+            self.code[addr] = self.code.get(addr, ()) + (instruction.pc,)
+
+    def add_compiled(self, pc, block, cells):
+        self.compiled[pc] = block
+        for addr in cells:
+            self.code[addr] = self.code.get(addr, ()) + (pc,)
+
+    def invalidate(self, addr):
+        for pc in self.code.pop(addr):
+            self.decoded.pop(pc, None)
+            if self.compiled.pop(pc, None) is not None:
+                self.code_written = True
+
+    def __getstate__(self):
+        # Decoded instructions and compiled blocks refer to opcode lambdas, which can't be pickled, so just decode again
+        return {'data': self.data, 'sparse': self.sparse}
+
+    def __setstate__(self, state):
+        self.data = state['data']
+        self.sparse = state['sparse']
+        self.decoded = {}
+        self.code = {}
+        self.compiled = {}
+        self.code_written = False
+
+    def copy(self):
+        result = Memory.__new__(Memory)
+        result.data = self.data[:]
+        result.sparse = self.sparse.copy()
+        # Decoded instructions are never modified once created, so the copy can reuse them
+        result.decoded = self.decoded.copy()
+        result.code = self.code.copy()
+        result.compiled = self.compiled.copy()
+        result.code_written = self.code_written
+        return result
+
+    def disassemble(self, hits=None):
+        # One line per instruction, or per cell where there isn't a valid one, with how many times
+        # each instruction ran if hits (pc -> count) is given
+        lines = []
+        pc = 0
+        while pc < len(self.data):
+            try:
+                instruction = Instruction(self, pc)
+                text = str(instruction)
+                size = instruction.size
+            except IntcodeException:
+                text = str(self.data[pc])
+                size = 1
+            count = '' if hits is None else hits.get(pc, '')
+            lines.append(f"{pc:>6} {count:>10}  {text}")
+            pc += size
+        lines.extend(f"[{addr}] {self.sparse[addr]}" for addr in sorted(self.sparse))
+        return "\n".join(lines)
 
     def __str__(self):
-        return "\n".join(f"{','.join(str(item) for item in batch)}," for batch in itertools.batched(self.data, 4))
+        lines = [f"{','.join(str(item) for item in batch)}," for batch in itertools.batched(self.data, 4)]
+        lines.extend(f"[{addr}] {self.sparse[addr]}" for addr in sorted(self.sparse))
+        return "\n".join(lines)
+
+
+# Longest run of instructions compiled into one block
+MAX_BLOCK_SIZE = 256
+
+
+def compile_block(memory, pc):
+    # Translates the straight-line run of instructions starting at pc into a Python function, which
+    # runs them and leaves the VM at the next instruction. Returns None if pc isn't a valid instruction.
+    start = pc
+    lines = ["def block(vm, memory, get, set):"]
+    namespace = {}
+    cells = []
+    count = 0
+    loop = False
+
+    def leave(target, ticks, indent="    "):
+        lines.append(f"{indent}vm.pc = {target}")
+        lines.append(f"{indent}vm.tick_count += {ticks}")
+        lines.append(f"{indent}return")
+
+    while count < MAX_BLOCK_SIZE:
+        try:
+            instruction = Instruction(memory, pc)
+        except IntcodeException:
+            break
+        count += 1
+        op = instruction.op
+        params = [instruction.source_parameter(i) for i in range(op.param_count)]
+        next_pc = pc + instruction.size
+        cells.extend(range(pc, next_pc))
+        lines.append(f"    # {pc}: {instruction}")
+        if op.branch is not None:
+            lines.append(f"    if {op.branch.format(*params)}:")
+            if params[-1] == str(start):
+                # Jumping back to the start of the block, so loop here instead of going back to run_compiled
+                loop = True
+                lines.append(f"        vm.tick_count += {count}")
+                lines.append("        continue")
+            else:
+                leave(params[-1], count, indent="        ")
+            pc = next_pc
+            break
+        if op.source is not None:
+            lines.extend(f"    {line}" for line in op.source.format(*params).split("\n"))
+            if op.param_count > op.potential_indirects:
+                # Parameters past the potential indirects are addresses to write to
+                lines.append("    if memory.code_written:")
+                leave(next_pc, count, indent="        ")
+        else:
+            function = f"op_{pc}"
+            namespace[function] = op.function
+            lines.append(f"    vm.pc = {next_pc}")
+            lines.append(f"    {function}(vm, [{', '.join(params)}])")
+            lines.append(f"    if vm.pc != {next_pc} or vm.is_halted or memory.code_written:")
+            lines.append(f"        vm.tick_count += {count}")
+            lines.append("        return")
+        pc = next_pc
+        if op.ends_block:
+            break
+
+    if count == 0:
+        return None
+    leave(pc, count)
+    if loop:
+        lines[1:] = ["    while True:"] + [f"    {line}" for line in lines[1:]]
+    source = "\n".join(lines)
+    exec(compile(source, f"<intcode block {start}>", "exec"), namespace)
+    block = namespace["block"]
+    block.source = source
+    memory.add_compiled(start, block, cells)
+    return block
+
+
+class Profile:
+    # Counts of how many times each opcode and each pc ran, and time spent waiting on input and output
+    def __init__(self):
+        self.op_counts = defaultdict(int)
+        self.pc_counts = defaultdict(int)
+        self.io_time = defaultdict(float)
+        self.run_time = 0.0
+
+    def copy(self):
+        result = Profile()
+        result.op_counts.update(self.op_counts)
+        result.pc_counts.update(self.pc_counts)
+        result.io_time.update(self.io_time)
+        result.run_time = self.run_time
+        return result
+
+    def report(self, memory, top=20, width=40):
+        lines = []
+        total = sum(self.pc_counts.values())
+        lines.append(f"{total} instructions in {self.run_time:.3f}s")
+        for name, seconds in sorted(self.io_time.items()):
+            lines.append(f"  {seconds:.3f}s waiting on {name}")
+        lines.append("by opcode:")
+        for name, count in sorted(self.op_counts.items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:<5} {count:>10} {100 * count / total:6.2f}%")
+        lines.append("hottest pcs:")
+        hottest = sorted(self.pc_counts.items(), key=lambda item: -item[1])[:top]
+        for pc, count in hottest:
+            bar = '#' * max(1, width * count // hottest[0][1])
+            try:
+                text = str(Instruction(memory, pc))
+            except IntcodeException:
+                text = '?'
+            lines.append(f"  {pc:>6} {count:>10} {bar:<{width}} {text}")
+        return "\n".join(lines)
 
 
 class IntcodeVM:
     def __init__(self, memory):
         self.tick_count = 0
         self.pc = 0
+        self.relative_base = 0
         self.memory = memory
         self.stdin = sys.stdin
         self.stdout = sys.stdout
         self.is_halted = False
         self.core_dump_enabled = True
         self.dbg = 0
+        # Run compiled blocks instead of interpreting one instruction at a time
+        self.compiled = False
+        # Set by enable_profiling(), which also makes run() use the interpreter
+        self.profile = None
+        # asyncio queues used instead of stdin and stdout when set, see run_async()
+        self.input = None
+        self.output = None
+        self.pending_input = []
+        self.waiting = False
+        self.scheduler = None
 
     def halt(self):
         self.is_halted = True
 
+    def enable_profiling(self):
+        self.profile = Profile()
+        return self.profile
+
+    def read_input(self):
+        if self.pending_input:
+            return self.pending_input.pop()
+        if self.input is not None:
+            try:
+                return self.input.get_nowait()
+            except asyncio.QueueEmpty:
+                raise InputStarved("Read error: waiting on input")
+        if self.profile is None:
+            line = self.stdin.readline()
+        else:
+            start = time.perf_counter()
+            line = self.stdin.readline()
+            self.profile.io_time['input'] += time.perf_counter() - start
+        if not line:
+            raise IntcodeException("Read error: end of input")
+        return int(line)
+
+    def write_output(self, value):
+        if self.output is not None:
+            self.output.put_nowait(value)
+        elif self.profile is None:
+            print(value, file=self.stdout)
+        else:
+            start = time.perf_counter()
+            print(value, file=self.stdout)
+            self.profile.io_time['output'] += time.perf_counter() - start
+
+    def send(self, value):
+        if self.input is None:
+            self.input = asyncio.Queue()
+        self.input.put_nowait(value)
+
+    def connect(self, other):
+        # Everything this VM outputs becomes input for other
+        if self.output is None:
+            self.output = asyncio.Queue()
+        other.input = self.output
+
+    async def wait_for_input(self):
+        start = time.perf_counter()
+        self.waiting = True
+        try:
+            if self.scheduler is not None:
+                self.scheduler.check_deadlock()
+            self.pending_input.append(await self.input.get())
+        finally:
+            self.waiting = False
+        if self.profile is not None:
+            self.profile.io_time['input'] += time.perf_counter() - start
+
+    async def run_async(self):
+        # Runs in the interpreter until the input port is empty, then lets other tasks run until
+        # something is sent. The compiled backend doesn't keep the pc up to date mid-block, so can't stop there.
+        while not self.is_halted:
+            try:
+                if self.profile is not None:
+                    self.run_profiled()
+                else:
+                    self.run_decoded()
+            except InputStarved:
+                if self.profile is None:
+                    # run_decoded counted the IN, which will run again
+                    self.tick_count -= 1
+                await self.wait_for_input()
+        if self.scheduler is not None:
+            self.scheduler.check_deadlock()
+
+    def fork(self):
+        result = copy.copy(self)
+        result.copy_state(self)
+        return result
+
+    def copy_state(self, other):
+        # Gives this VM its own copy of everything of other's that running changes in place. The input
+        # and output queues are connections rather than state, so they stay shared.
+        self.memory = other.memory.copy()
+        self.pending_input = list(other.pending_input)
+        if other.profile is not None:
+            self.profile = other.profile.copy()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['stdin']
+        del state['stdout']
+        state['input'] = None
+        state['output'] = None
+        state['scheduler'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.stdin = sys.stdin
+        self.stdout = sys.stdout
+
+    def snapshot(self):
+        return self.fork()
+
+    def restore(self, snapshot):
+        self.__dict__.update(snapshot.__dict__)
+        self.copy_state(snapshot)
+
     def get_params(self, count):
         return self.memory[self.pc+1:self.pc+1+count]
 
+    def decode(self, pc):
+        instruction = self.memory.decoded.get(pc)
+        if instruction is None:
+            instruction = Instruction(self.memory, pc)
+            self.memory.add_decoded(instruction)
+        return instruction
+
     def tick(self):
         self.tick_count += 1
-        instruction = Instruction(self.memory, self.pc)
+        instruction = self.decode(self.pc)
         if self.dbg:
             print(str(instruction))
         instruction.execute(self)
 
     def run(self):
-        while not self.is_halted:
-            try:
-                self.tick()
-                if self.dbg >= 2:
-                    print(self)
-            except IntcodeException as e:
-                print(f"Intcode program exception: {e}")
-                if self.core_dump_enabled:
-                    print(self)
-                self.halt()
+        try:
+            if self.profile is not None:
+                self.run_profiled()
+            elif self.compiled and not self.dbg:
+                self.run_compiled()
+            else:
+                self.run_decoded()
+        except IntcodeException as e:
+            print(f"Intcode program exception: {e}")
+            if self.core_dump_enabled:
+                print(self)
+            self.halt()
         print("Program halted")
+        if self.profile is not None:
+            print(self.profile.report(self.memory))
+
+    def run_profiled(self):
+        # Kept apart from run_decoded so the counting costs nothing when profiling is off
+        profile = self.profile
+        op_counts = profile.op_counts
+        pc_counts = profile.pc_counts
+        decode = self.decode
+        start = time.perf_counter()
+        try:
+            while not self.is_halted:
+                pc = self.pc
+                instruction = decode(pc)
+                if self.dbg:
+                    print(str(instruction))
+                instruction.execute(self)
+                # Counted afterwards so an IN waiting on input isn't counted twice
+                pc_counts[pc] += 1
+                op_counts[instruction.op.name] += 1
+                self.tick_count += 1
+        finally:
+            profile.run_time += time.perf_counter() - start
+
+    def run_decoded(self):
+        # Same as calling tick() until halted, with everything the loop touches held in locals
+        memory = self.memory
+        decoded = memory.decoded
+        decode = self.decode
+        get = memory.get
+        trace = self.dbg
+        ticks = self.tick_count
+        try:
+            while not self.is_halted:
+                pc = self.pc
+                instruction = decoded.get(pc)
+                if instruction is None:
+                    instruction = decode(pc)
+                ticks += 1
+                if trace:
+                    self.tick_count = ticks
+                    print(str(instruction))
+                function, parameters, indirect, relative, size = instruction.decoded
+                if indirect:
+                    parameters = list(parameters)
+                    for i in relative:
+                        parameters[i] += self.relative_base
+                    for i in indirect:
+                        parameters[i] = get(parameters[i])
+                elif relative:
+                    parameters = list(parameters)
+                    for i in relative:
+                        parameters[i] += self.relative_base
+                self.pc = pc + size
+                function(self, parameters)
+                if trace >= 2:
+                    self.tick_count = ticks
+                    print(self)
+        finally:
+            self.tick_count = ticks
+
+    def run_compiled(self):
+        memory = self.memory
+        compiled = memory.compiled
+        get = memory.get
+        set = memory.set
+        # Anything written over before this run has already been thrown away
+        memory.code_written = False
+        while not self.is_halted:
+            if memory.code_written:
+                # The program wrote over its own code, so finish in the interpreter
+                self.run_decoded()
+                return
+            block = compiled.get(self.pc)
+            if block is None:
+                block = compile_block(memory, self.pc)
+                if block is None:
+                    # Not a valid instruction, let the interpreter raise the error
+                    self.tick()
+                    continue
+            block(self, memory, get, set)
 
     def __str__(self):
         result = []
         result.append(f"tick {self.tick_count}")
         result.append(f"{self.pc = }; {self.is_halted = };")
-        result.append(f"memory:\n{str(self.memory)}")
+        if self.profile is None:
+            result.append(f"memory:\n{str(self.memory)}")
+        else:
+            result.append(f"memory:\n{self.memory.disassemble(self.profile.pc_counts)}")
         result.append('\n')
         return '\n'.join(result)
 
+    @staticmethod
+    def parse(file):
+        program = []
+        for line in file:
+            program.extend(int(token) for token in line.split(','))
+        return program
+
     @classmethod
     def from_file(cls, file):
-        program = []
-        with open(file, 'r') as file:
-            for line in file:
-                program.extend(int(token) for token in line.split(','))
-        return cls(Memory(program))
+        return cls(Memory(parse_file(cls.parse, file)))
+
+
+class Scheduler:
+    # Runs any number of VMs as tasks on one thread. Each one runs until it needs input that hasn't been
+    # sent yet, then waits on its queue, so nothing busy-waits.
+    def __init__(self, vms=()):
+        self.vms = []
+        for vm in vms:
+            self.add(vm)
+
+    def add(self, vm):
+        vm.scheduler = self
+        if vm.input is None:
+            vm.input = asyncio.Queue()
+        self.vms.append(vm)
+        return vm
+
+    def check_deadlock(self):
+        # Called when a VM is about to wait or has halted. If every running VM is waiting on an empty
+        # queue, nothing can ever send anything.
+        waiting = False
+        for vm in self.vms:
+            if vm.is_halted:
+                continue
+            if not (vm.waiting and vm.input.empty()):
+                return
+            waiting = True
+        if waiting:
+            raise Deadlock("Every VM is waiting on input")
+
+    async def run_async(self):
+        tasks = [asyncio.ensure_future(vm.run_async()) for vm in self.vms]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def run(self):
+        asyncio.run(self.run_async())
+
+
+class MemoryEquals:
+    # Predicate for search(), true when a halted VM has the given value at an address
+    def __init__(self, addr, value):
+        self.addr = addr
+        self.value = value
+
+    def __call__(self, vm):
+        return vm.memory.get(self.addr) == self.value
+
+
+def patch_at(patches, index):
+    # patches is a list of (addr, values) pairs, index picks one combination of values in
+    # the same order itertools.product would
+    result = []
+    for addr, values in reversed(patches):
+        index, i = divmod(index, len(values))
+        result.append((addr, values[i]))
+    return dict(reversed(result))
+
+
+def try_patch(vm, patch, predicate):
+    vm = vm.fork()
+    for addr, value in patch.items():
+        vm.memory.set(addr, value)
+    try:
+        vm.run_decoded()
+    except IntcodeException:
+        return False
+    return predicate(vm)
+
+
+# Each search worker gets the program, patches and predicate once when it starts, not with every shard
+search_state = None
+
+
+def init_search_worker(vm, patches, predicate, best_index):
+    global search_state
+    search_state = (vm, patches, predicate, best_index)
+
+
+def search_shard(start, stop):
+    vm, patches, predicate, best_index = search_state
+    for index in range(start, stop):
+        # Stop early once another shard has found a match that comes before this one
+        if index > best_index.value:
+            return None
+        if try_patch(vm, patch_at(patches, index), predicate):
+            with best_index.get_lock():
+                best_index.value = min(best_index.value, index)
+            return index
+    return None
+
+
+def search(vm, patches, predicate, jobs=None, shard_size=None):
+    # Tries every combination of values for the patched addresses (a dict of addr -> values) and
+    # returns the first, in itertools.product order, that leaves a VM satisfying predicate
+    patches = [(addr, tuple(values)) for addr, values in patches.items()]
+    total = 1
+    for _, values in patches:
+        total *= len(values)
+
+    if jobs == 1:
+        for index in range(total):
+            patch = patch_at(patches, index)
+            if try_patch(vm, patch, predicate):
+                return patch
+        return None
+
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    if shard_size is None:
+        shard_size = max(1, total // (jobs * 8))
+
+    best_index = multiprocessing.Value('q', total)
+    found = None
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=init_search_worker, initargs=(vm, patches, predicate, best_index)) as executor:
+        futures = {executor.submit(search_shard, start, min(start + shard_size, total)): start for start in range(0, total, shard_size)}
+        for future in concurrent.futures.as_completed(futures):
+            if future.cancelled():
+                continue
+            index = future.result()
+            if index is None:
+                continue
+            if found is None or index < found:
+                found = index
+            # Shards that come after the match can't give a better one
+            for other, start in futures.items():
+                if start > found:
+                    other.cancel()
+    if found is None:
+        return None
+    return patch_at(patches, found)
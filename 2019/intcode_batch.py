@@ -0,0 +1,202 @@
+import itertools
+import numpy as np
+from intcode import IntcodeException, IntcodeVM, InvalidOpcode, Memory, Opcode, IMMEDIATE, RELATIVE, parameter_modes
+
+
+# Results of ADD and MUL at least this big might not fit in an int64, so those VMs carry on in the
+# interpreter, which uses Python ints
+OVERFLOW_LIMIT = 2.0 ** 62
+
+
+def arithmetic(function):
+    def execute(batch, rows, params, pc):
+        approx = function(params[0].astype(np.float64), params[1].astype(np.float64))
+        risky = np.abs(approx) >= OVERFLOW_LIMIT
+        if risky.any():
+            batch.unbatch(rows[risky], pc)
+            keep = ~risky
+            rows, params = rows[keep], [param[keep] for param in params]
+        batch.write(rows, params[2], function(params[0], params[1]), pc)
+    return execute
+
+
+def compare(function):
+    return lambda batch, rows, params, pc: batch.write(rows, params[2], function(params[0], params[1]).astype(np.int64), pc)
+
+
+def jump(condition):
+    def execute(batch, rows, params, pc):
+        taken = condition(params[0])
+        batch.pc[rows[taken]] = params[1][taken]
+    return execute
+
+
+def adjust_relative_base(batch, rows, params, pc):
+    batch.relative_base[rows] += params[0]
+
+
+def halt(batch, rows, params, pc):
+    batch.halted[rows] = True
+
+
+# Vectorized versions of the opcodes, by code. Rows that reach an opcode that isn't here carry on in the interpreter.
+VECTOR_OPS = {
+    Opcode.ADD.code: arithmetic(lambda a, b: a + b),
+    Opcode.MUL.code: arithmetic(lambda a, b: a * b),
+    Opcode.JT.code: jump(lambda value: value != 0),
+    Opcode.JF.code: jump(lambda value: value == 0),
+    Opcode.LT.code: compare(lambda a, b: a < b),
+    Opcode.EQ.code: compare(lambda a, b: a == b),
+    Opcode.ARB.code: adjust_relative_base,
+    Opcode.HALT.code: halt,
+}
+
+
+class BatchVM:
+    # Runs the same program on many memories at once, one row of a 2D array each. Rows at the same pc
+    # with the same opcode are stepped together, so they run in lockstep until their pcs diverge and
+    # then in as many groups as there are distinct pcs.
+    def __init__(self, memories):
+        self.memory = np.array(memories, dtype=np.int64, ndmin=2)
+        count = len(self.memory)
+        self.pc = np.zeros(count, dtype=np.int64)
+        self.relative_base = np.zeros(count, dtype=np.int64)
+        self.tick_count = np.zeros(count, dtype=np.int64)
+        self.halted = np.zeros(count, dtype=bool)
+        # Rows that hit an error or were handed off to an IntcodeVM, which count as halted here too
+        self.detached = np.zeros(count, dtype=bool)
+        self.errors = {}
+        self.vms = {}
+
+    def __len__(self):
+        return len(self.memory)
+
+    @classmethod
+    def from_vm(cls, vm, count):
+        batch = cls(np.tile(np.array(vm.memory.data, dtype=np.int64), (count, 1)))
+        batch.pc[:] = vm.pc
+        batch.relative_base[:] = vm.relative_base
+        for addr, value in vm.memory.sparse.items():
+            batch.set(addr, value)
+        return batch
+
+    @classmethod
+    def sweep(cls, vm, patches):
+        # One row for every combination of values for the patched addresses (a dict of addr -> values),
+        # in itertools.product order
+        combinations = np.array(list(itertools.product(*patches.values())), dtype=np.int64)
+        batch = cls.from_vm(vm, len(combinations))
+        for i, addr in enumerate(patches):
+            batch.set(addr, combinations[:, i])
+        return batch
+
+    def set(self, addr, values):
+        self.write(np.arange(len(self)), np.full(len(self), addr), values)
+
+    def get(self, addr):
+        rows = np.arange(len(self))
+        values = self.read(rows, np.full(len(self), addr))
+        if len(self.vms) > 0:
+            values = values.astype(object)
+            for row, vm in self.vms.items():
+                values[row] = vm.memory.get(addr)
+        return values
+
+    def fail(self, rows, message):
+        for row in rows:
+            self.errors[int(row)] = message
+        self.halted[rows] = True
+        self.detached[rows] = True
+
+    def read(self, rows, addrs):
+        negative = addrs < 0
+        if negative.any():
+            self.fail(rows[negative], "Read error: address out of bounds")
+        values = np.zeros(len(rows), dtype=np.int64)
+        inside = ~negative & (addrs < self.memory.shape[1])
+        values[inside] = self.memory[rows[inside], addrs[inside]]
+        return values
+
+    def write(self, rows, addrs, values, pc=None):
+        # pc is the instruction doing the write, if it's not a write from outside the program
+        values = np.broadcast_to(values, rows.shape)
+        negative = addrs < 0
+        if negative.any():
+            self.fail(rows[negative], "Write error: address out of bounds")
+        far = addrs >= self.memory.shape[1] + Memory.MAX_GROWTH
+        if far.any():
+            # Only the interpreter's memory can hold sparse addresses, so those rows go to it and either
+            # run the instruction again there or just get the value set
+            self.unbatch(rows[far], pc)
+            if pc is None:
+                for row, addr, value in zip(rows[far], addrs[far], values[far]):
+                    self.vms[int(row)].memory.set(int(addr), int(value))
+        keep = ~negative & ~far & ~self.detached[rows]
+        rows, addrs, values = rows[keep], addrs[keep], values[keep]
+        if len(addrs) > 0 and addrs.max() >= self.memory.shape[1]:
+            self.grow(int(addrs.max()) + 1)
+        self.memory[rows, addrs] = values
+
+    def grow(self, size):
+        size = max(size, 2 * self.memory.shape[1])
+        self.memory = np.pad(self.memory, ((0, 0), (0, size - self.memory.shape[1])))
+
+    def unbatch(self, rows, pc):
+        # Carries these rows on in the interpreter, from pc if given or else from where they are now
+        for row in rows:
+            row = int(row)
+            vm = IntcodeVM(Memory([int(value) for value in self.memory[row]]))
+            vm.pc = int(self.pc[row]) if pc is None else pc
+            vm.relative_base = int(self.relative_base[row])
+            vm.tick_count = int(self.tick_count[row])
+            self.vms[row] = vm
+        self.halted[rows] = True
+        self.detached[rows] = True
+
+    def step(self, rows, pc, full_opcode):
+        try:
+            op = Opcode.from_code(full_opcode % 100)
+            modes = parameter_modes(op, full_opcode)
+        except InvalidOpcode as e:
+            self.fail(rows, str(e))
+            return
+        execute = VECTOR_OPS.get(op.code)
+        if execute is None:
+            self.unbatch(rows, pc)
+            return
+        params = []
+        for i, mode in enumerate(modes):
+            param = self.read(rows, np.full(len(rows), pc + 1 + i))
+            if mode == RELATIVE:
+                param = param + self.relative_base[rows]
+            if i < op.potential_indirects and mode != IMMEDIATE:
+                param = self.read(rows, param)
+            params.append(param)
+        self.pc[rows] = pc + op.param_count + 1
+        execute(self, rows, params, pc)
+        # Counted afterwards so rows handed off partway through don't count the instruction twice
+        self.tick_count[rows] += 1
+
+    def run(self):
+        while True:
+            rows = np.flatnonzero(~self.halted)
+            if len(rows) == 0:
+                break
+            pcs = self.pc[rows]
+            opcodes = self.read(rows, pcs)
+            if (pcs == pcs[0]).all() and (opcodes == opcodes[0]).all():
+                self.step(rows, int(pcs[0]), int(opcodes[0]))
+                continue
+            # The rows have diverged, step each group of rows at the same instruction separately
+            keys, groups = np.unique(np.stack([pcs, opcodes], axis=1), axis=0, return_inverse=True)
+            for i, (pc, full_opcode) in enumerate(keys):
+                self.step(rows[groups.reshape(-1) == i], int(pc), int(full_opcode))
+
+        for row, vm in self.vms.items():
+            try:
+                vm.run_decoded()
+            except IntcodeException as e:
+                self.errors[row] = str(e)
+            self.pc[row] = vm.pc
+            self.relative_base[row] = vm.relative_base
+            self.tick_count[row] = vm.tick_count
@@ -0,0 +1,229 @@
+import io
+import itertools
+from intcode import IntcodeException, IntcodeVM, Memory, OutOfBoundsException
+
+
+class SymbolicException(IntcodeException):
+    # The program did something with a symbolic value that can't be followed without knowing it,
+    # like branching on it
+    pass
+
+
+class Symbolic:
+    def fail(self, *args):
+        raise SymbolicException(f"Program depends on the value of {self}")
+
+    # Anything that needs an actual value, like comparisons for branches or decoding an opcode
+    __eq__ = __ne__ = __lt__ = __le__ = __gt__ = __ge__ = fail
+    __bool__ = __int__ = __index__ = __mod__ = __floordiv__ = fail
+    __hash__ = None
+
+
+class Unknown(Symbolic):
+    # A value that depends on the variables, but not as a polynomial, such as a read from a
+    # symbolic address. Fine as long as nothing ends up depending on it.
+    def __add__(self, other):
+        return self
+
+    __radd__ = __mul__ = __rmul__ = __add__
+
+    def __str__(self):
+        return "?"
+
+
+UNKNOWN = Unknown()
+
+
+def polynomial(terms):
+    # Constant polynomials are just ints, so everything not involving the variables stays concrete
+    terms = {monomial: coefficient for monomial, coefficient in terms.items() if coefficient != 0}
+    if len(terms) == 0:
+        return 0
+    if list(terms) == [()]:
+        return terms[()]
+    return Polynomial(terms)
+
+
+def multiply_monomials(a, b):
+    powers = dict(a)
+    for name, power in b:
+        powers[name] = powers.get(name, 0) + power
+    return tuple(sorted(powers.items()))
+
+
+class Polynomial(Symbolic):
+    # Terms are {monomial: coefficient}, where a monomial is a sorted tuple of (variable, power) pairs
+    def __init__(self, terms):
+        self.terms = terms
+
+    @classmethod
+    def variable(cls, name):
+        return cls({((name, 1),): 1})
+
+    def __add__(self, other):
+        if isinstance(other, Unknown):
+            return other
+        terms = dict(self.terms)
+        for monomial, coefficient in as_terms(other).items():
+            terms[monomial] = terms.get(monomial, 0) + coefficient
+        return polynomial(terms)
+
+    __radd__ = __add__
+
+    def __mul__(self, other):
+        if isinstance(other, Unknown):
+            return other
+        terms = {}
+        for a, x in self.terms.items():
+            for b, y in as_terms(other).items():
+                monomial = multiply_monomials(a, b)
+                terms[monomial] = terms.get(monomial, 0) + x * y
+        return polynomial(terms)
+
+    __rmul__ = __mul__
+
+    def variables(self):
+        return {name for monomial in self.terms for name, _ in monomial}
+
+    def evaluate(self, values):
+        total = 0
+        for monomial, coefficient in self.terms.items():
+            for name, power in monomial:
+                coefficient *= values[name] ** power
+            total += coefficient
+        return total
+
+    def split(self, name):
+        # Returns (p, q) with self == p * name + q, or None if self isn't linear in name
+        p = {}
+        q = {}
+        for monomial, coefficient in self.terms.items():
+            powers = dict(monomial)
+            power = powers.pop(name, 0)
+            if power > 1:
+                return None
+            (p if power == 1 else q)[tuple(sorted(powers.items()))] = coefficient
+        return polynomial(p), polynomial(q)
+
+    def __str__(self):
+        result = []
+        for monomial, coefficient in sorted(self.terms.items(), key=lambda term: (-sum(power for _, power in term[0]), term[0])):
+            factors = [name if power == 1 else f"{name}^{power}" for name, power in monomial]
+            if coefficient != 1 or len(factors) == 0:
+                factors.insert(0, str(coefficient))
+            result.append("*".join(factors))
+        return " + ".join(result).replace("+ -", "- ")
+
+    def __repr__(self):
+        return f"Polynomial({self})"
+
+
+def as_terms(value):
+    if isinstance(value, Polynomial):
+        return value.terms
+    return {(): value}
+
+
+def evaluate(value, values):
+    return value.evaluate(values) if isinstance(value, Polynomial) else value
+
+
+class SymbolicMemory(Memory):
+    # Memory that can hold polynomials as well as ints. Reading from an address that depends on the
+    # variables gives UNKNOWN, and writing to one loses track of the whole memory so isn't allowed.
+    def __init__(self, data):
+        super().__init__([])
+        self.data = list(data)
+
+    def get(self, addr):
+        if isinstance(addr, Symbolic):
+            return UNKNOWN
+        return super().get(addr)
+
+    def set(self, addr, value):
+        if isinstance(addr, Symbolic):
+            raise SymbolicException(f"Write to symbolic address {addr}")
+        if addr < 0:
+            raise OutOfBoundsException(f"Write error: {addr} is out of bounds")
+        if addr >= len(self.data):
+            self.grow(addr + 1)
+        self.data[addr] = value
+        if addr in self.code:
+            self.invalidate(addr)
+
+
+def analyze(vm, variables, max_ticks=100000):
+    # Runs a copy of vm with the given addresses (a dict of addr -> variable name) replaced by
+    # variables, and returns the halted copy, whose memory holds the results as polynomials in them.
+    # Raises SymbolicException if the program branches on a variable, or if it doesn't halt in time.
+    memory = SymbolicMemory(vm.memory.data)
+    for addr, value in vm.memory.sparse.items():
+        memory.set(addr, value)
+    for addr, name in variables.items():
+        memory.set(addr, Polynomial.variable(name))
+    result = IntcodeVM(memory)
+    result.pc = vm.pc
+    result.relative_base = vm.relative_base
+    # There's no input to give it, and nobody wants its output
+    result.stdin = io.StringIO()
+    result.stdout = io.StringIO()
+    try:
+        while not result.is_halted:
+            if result.tick_count >= max_ticks:
+                raise SymbolicException(f"Still running after {max_ticks} ticks")
+            result.tick()
+    except SymbolicException:
+        raise
+    except (IntcodeException, TypeError) as e:
+        # TypeError is something an opcode does that Symbolic doesn't support
+        raise SymbolicException(f"Analysis stopped at pc {result.pc}: {e}")
+    return result
+
+
+def solve(vm, patches, addr, target):
+    # Same as search(vm, patches, MemoryEquals(addr, target)), but runs the program once symbolically
+    # and solves for the patched values instead of trying them all. Raises SymbolicException if the
+    # program can't be analyzed, in which case search() still works.
+    names = {patch: f"x{patch}" for patch in patches}
+    domains = {names[patch]: tuple(values) for patch, values in patches.items()}
+    value = analyze(vm, names).memory.get(addr)
+    if isinstance(value, Unknown):
+        raise SymbolicException(f"Address {addr} doesn't depend on the patches as a polynomial")
+
+    def candidates():
+        if not isinstance(value, Polynomial):
+            if value == target:
+                yield from itertools.product(*domains.values())
+            return
+        # With the polynomial linear in one of the variables, only the others need trying, since
+        # that one can be solved for directly
+        for name in names.values():
+            split = value.split(name)
+            if split is not None:
+                break
+        else:
+            yield from (values for values in itertools.product(*domains.values()) if value.evaluate(dict(zip(domains, values))) == target)
+            return
+        p, q = split
+        others = [other for other in domains if other != name]
+        allowed = set(domains[name])
+        for values in itertools.product(*(domains[other] for other in others)):
+            known = dict(zip(others, values))
+            p_value = evaluate(p, known)
+            rest = target - evaluate(q, known)
+            if p_value == 0:
+                solutions = domains[name] if rest == 0 else ()
+            elif rest % p_value == 0 and rest // p_value in allowed:
+                solutions = (rest // p_value,)
+            else:
+                solutions = ()
+            for solution in solutions:
+                known[name] = solution
+                yield tuple(known[variable] for variable in domains)
+
+    # The first match in itertools.product order, like search() gives
+    order = {name: {value: i for i, value in enumerate(values)} for name, values in domains.items()}
+    best = min(candidates(), key=lambda values: tuple(order[name][value] for name, value in zip(domains, values)), default=None)
+    if best is None:
+        return None
+    return dict(zip(patches, best))
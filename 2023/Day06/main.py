@@ -1,35 +1,32 @@
 #!/usr/bin/env python3
 import argparse
-from progressbar import progressbar
-
-DEBUG=True
-def dbg_print(*args, level=1, **kwargs):
-    if DEBUG >= level:
-        print(*args, **kwargs)
-
+import math
+from aoc_util import dbg
+
+
+def ways_to_win(time, record_distance):
+    # Holding for h goes h * (time - h), which beats the record for every h strictly between the
+    # roots of h^2 - time*h + record_distance. The ways to win are symmetric about time / 2, so only
+    # the lowest one is needed. isqrt gets it to within a step, then it's moved to the exact boundary.
+    half = time // 2
+    if half * (time - half) <= record_distance:
+        return 0
+    discriminant = time * time - 4 * record_distance
+    low = (time - math.isqrt(discriminant)) // 2
+    while low > 0 and (low - 1) * (time - low + 1) > record_distance:
+        low -= 1
+    while low * (time - low) <= record_distance:
+        low += 1
+    dbg.printf("Race of {} beats {} holding from {} to {}", time, record_distance, low, time - low, level=2)
+    return time - 2 * low + 1
 
 
 def part1(input_file):
     with open(input_file, 'r') as file:
-        race_times = [] #ms
-        race_distances = [] #mm
-
         times = [int(token) for token in file.readline().split(':')[-1].strip().split()]
         distances = [int(token) for token in file.readline().split(':')[-1].strip().split()]
 
-        prod = 1
-        for time, record_distance in zip(times, distances):
-            ways_to_beat_record = 0
-            for i in progressbar(range(time)):
-                # spend i seconds accelerating
-                speed = i
-                time_left = time-i
-                distance = speed * time_left
-                if distance > record_distance:
-                    ways_to_beat_record+=1
-            prod *= ways_to_beat_record
-
-    return prod
+    return math.prod(ways_to_win(time, record_distance) for time, record_distance in zip(times, distances))
 
 
 def part2(input_file):
@@ -37,15 +34,7 @@ def part2(input_file):
         time = int(file.readline().split(':')[-1].replace(' ', ''))
         record_distance = int(file.readline().split(':')[-1].replace(' ', ''))
 
-        count = 0
-        for i in range(time):
-            speed = i
-            time_left = time-i
-            distance = speed * time_left
-            if distance > record_distance:
-                count += 1
-
-    return count
+    return ways_to_win(time, record_distance)
 
 
 if __name__ == "__main__":
@@ -53,7 +42,7 @@ if __name__ == "__main__":
     parser.add_argument('filename', nargs='?', default='input.txt')
     parser.add_argument('-v', '--verbose', action='count', default=0)
     args = parser.parse_args()
-    DEBUG = args.verbose
+    dbg.set_level(args.verbose)
 
     print(part1(args.filename))
     print(part2(args.filename))
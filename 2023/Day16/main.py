@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 import argparse
 from collections import deque as queue
-from aoc_util import dbg_print, RelativeDirection, CardinalDirection, Point
+from aoc_util import RelativeDirection, CardinalDirection, Point
 import time
 
+DEBUG=0
+
 def dbg_print(*args, level=1, **kwargs):
     if DEBUG >= level:
         print(*args, **kwargs)
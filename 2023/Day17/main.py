@@ -105,11 +105,14 @@ class Crucible:
 
         return Crucible(self.board, self.move(facing), facing, max_forwards)
 
+    def key(self):
+        return (self.position, self.facing, self.max_forwards)
+
     def __hash__(self):
-        return hash(f'{self.position}, {self.facing}, {self.max_forwards}')
+        return hash(self.key())
 
     def __eq__(self, other):
-        return hash(self) == hash(other)
+        return self.key() == other.key()
 
     def show_path(self, solution):
         chars = [[c for c in line] for line in  self.board]
@@ -143,6 +146,9 @@ class UltraCrucible(Crucible):
 
         return UltraCrucible(self.board, self.move(facing), facing, max_forwards, until_can_turn)
 
+    def key(self):
+        return (self.position, self.facing, self.max_forwards, self.until_can_turn)
+
     def isWinState(self):
         return (len(self.board[0])-1, len(self.board)-1) == self.position and self.until_can_turn <= 0
 
@@ -159,7 +165,7 @@ def problem(input_file, part2=False):
 
     print(start_state.show_path(solution))
 
-    return None
+    return solution.cost
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import argparse
 from enum import Enum
-from aoc_util import dbg, InclusiveRange
+from aoc_util import dbg, RangeSet
 from math import prod
 
 categories = ('x', 'm', 'a', 's')
@@ -54,11 +54,9 @@ class Rule:
         approved = Part(part.copy())
         rejected = Part(part.copy())
         if self.op == '>':
-            approved[self.key] = range.intersection(InclusiveRange(self.value+1, float('inf')))
-            rejected[self.key] = range.intersection(InclusiveRange(-float('inf'), self.value))
+            rejected[self.key], approved[self.key] = range.split(self.value+1)
         elif self.op == '<':
-            approved[self.key] = range.intersection(InclusiveRange(-float('inf'), self.value-1))
-            rejected[self.key] = range.intersection(InclusiveRange(self.value, float('inf')))
+            approved[self.key], rejected[self.key] = range.split(self.value)
         return approved, rejected
 
     @classmethod
@@ -166,7 +164,7 @@ def problem(input_file, part2=False):
             return total
         else:
             p = Part()
-            r = InclusiveRange(1,4000)
+            r = RangeSet([(1,4001)])
             for c in categories:
                 p[c] = r
 
@@ -1,53 +1,52 @@
 #!/usr/bin/env python3
 import argparse
-from aoc_util import dbg, CardinalDirection, RelativeDirection, Point
+from aoc_util import dbg, CardinalDirection, Grid, DIRECTION_CHARS, INT_TURNS
 
 class Board:
     def __init__(self, grid, pos, direction):
         self.grid = grid
-        self.width = len(grid[0])
-        self.height = len(grid)
+        self.width = grid.width
+        self.height = grid.height
         self.starting_pos = pos
         self.starting_direction = direction
         self.reset()
 
     @classmethod
     def from_file(cls, file):
-        grid = []
-        pos = None
-        for y,line in enumerate(file):
-            line = line.strip()
-            if '^' in line:
-                pos = Point(line.index('^'), y)
-            grid.append([c for c in line])
-        x,y = pos
-        grid[y][x] = '.'
-        return cls(grid, pos, CardinalDirection.NORTH)
+        grid = Grid.from_file(file)
+        pos = grid.find('^')
+        grid.data[pos] = ord('.')
+        return cls(grid, pos, CardinalDirection.NORTH.value)
 
     def __str__(self):
-#        return ''.join(''.join(line for line in self.grid))
         result = []
-        for y,line in enumerate(self.grid):
+        for y in range(self.height):
             result_line = []
-            for x,c in enumerate(line):
-                p = Point(x,y)
+            for x in range(self.width):
+                p = self.grid.index((x,y))
                 if p == self.pos:
-                    result_line.append(self.direction.as_char())
+                    result_line.append(DIRECTION_CHARS[self.direction])
                 elif p in self.visited_spaces:
                     result_line.append('X')
                 else:
-                    result_line.append(c)
+                    result_line.append(chr(self.grid.data[p]))
             result.append(''.join(result_line))
         return '\n'.join(result)
 
     def walk(self):
+        data = self.grid.data
+        pad = self.grid.pad
+        wall = ord('#')
+        turn_right = INT_TURNS[1]
+        delta = self.grid.deltas[self.direction]
         while True:
-            next_pos = self.pos.move(self.direction)
-            if not self.in_bounds(next_pos):
+            next_pos = self.pos + delta
+            tile = data[next_pos]
+            if tile == pad:
                 self.pos = next_pos
                 return False
-            elif self.grid[next_pos.y][next_pos.x] == '#' or next_pos == self.test_obstacle:
-                self.direction = self.direction.turn(RelativeDirection.RIGHT)
+            elif tile == wall or next_pos == self.test_obstacle:
+                self.direction = turn_right[self.direction]
                 if (self.pos, self.direction) in self.visited:
                     return False
                 self.visited.add((self.pos, self.direction))
@@ -65,14 +64,14 @@ class Board:
     def in_bounds(self, position=None):
         if position is None:
             position = self.pos
-        return not (position.x < 0 or position.x >= self.width or position.y < 0 or position.y >= self.height)
+        return self.grid.in_bounds(position)
 
     def reset(self):
         self.pos = self.starting_pos
         self.direction = self.starting_direction
-        self.visited = set((self.pos,self.direction))
+        self.visited = set(((self.pos,self.direction),))
         self.visited_spaces = set((self.pos,))
-        self.test_obstacle = Point(-1,-1)
+        self.test_obstacle = -1
 
 def problem(input_file, part2=False):
     with open(input_file, 'r') as file:
@@ -80,7 +79,7 @@ def problem(input_file, part2=False):
     dbg.print(board)
     board.walk_off()
     if not part2:
-        return len(board.visited)
+        return len(board.visited_spaces)
 
     loop_points = set()
     test_locations = board.visited_spaces
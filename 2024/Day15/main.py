@@ -90,7 +90,7 @@ class Map:
         dbg.print(self)
         dbg.print()
         for move in moves:
-            dbg.print(f"Move {move.as_char()}:")
+            dbg.print(lambda: f"Move {move.as_char()}:")
             self.move(move)
             dbg.print(self)
             dbg.print()
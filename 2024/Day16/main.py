@@ -55,12 +55,6 @@ class Maze(astar.AStar):
             # If the position is not the same it must be a single step
             return 1
 
-    def heuristic_cost_estimate(self, current, goal):
-        return 0
-        x1,y1 = current.position
-        x2,y2 = goal
-        return abs(x1-x2)+abs(y1-y2)
-
     def is_goal_reached(self, current, goal):
         return current.position == goal
 
@@ -127,11 +121,8 @@ def problem(input_file, part2=False):
         print(maze.draw(path))
         return sum(maze.distance_between(a,b) for a,b in zip(path, path[1:]))
     paths = maze.astar(SearchNode(maze.start, CardinalDirection.EAST), maze.end, findAll=True)
-    print(f"Found {len(paths)} paths")
-    used = set()
-    for path in paths:
-        for node in path:
-            used.add(node.position)
+    print(f"Found {paths.count()} paths")
+    used = set(node.position for node in paths.nodes())
     return len(used)
 
 
@@ -21,7 +21,7 @@ def adv(machine, operand):
     machine.pc += 2
 
 def bxl(machine, operand):
-    dbg.print(f"Setting B to {machine.B} ^ {operand} = {machine.B ^ operand}")
+    dbg.printf("Setting B to {} ^ {} = {}", machine.B, operand, machine.B ^ operand)
     machine.B = machine.B ^ operand
     machine.pc += 2
 
@@ -66,6 +66,150 @@ opcodes = {
 combo_opcodes = set((0,2,5,6,7))
 
 
+# Python source for each opcode, for compile_program(). {combo} and {literal} are the operand
+# as a combo operand and as a literal.
+opcode_sources = {
+    0: "A = A >> {combo}",
+    1: "B = B ^ {literal}",
+    2: "B = {combo} % 8",
+    4: "B = B ^ C",
+    5: "output.append({combo} % 8)",
+    6: "B = A >> {combo}",
+    7: "C = A >> {combo}",
+}
+
+combo_sources = ["0", "1", "2", "3", "A", "B", "C"]
+
+# The same for compile_batch(), where the registers are numpy arrays. Shifts go through shift() since
+# numpy doesn't give 0 for shifts of 64 bits or more, and outputs are checked against the program
+# as they happen rather than collected. register() makes sure a literal loaded into B is still an
+# array the same shape as A.
+batch_sources = {
+    0: "A = shift(A, {combo})",
+    1: "B = B ^ {literal}",
+    2: "B = register({combo} % 8, A)",
+    4: "B = B ^ C",
+    5: "A, B, C, index = keep_matching(A, B, C, index, {combo}, count)\ncount += 1",
+    6: "B = shift(A, {combo})",
+    7: "C = shift(A, {combo})",
+}
+
+
+def compile_body(program, sources=opcode_sources):
+    # Source for the program with its jnz left out. Only programs that are a single loop, with one jnz
+    # at the end going back to the start, can be compiled.
+    jumps = [pc for pc in range(0, len(program), 2) if program[pc] == 3]
+    if jumps and (jumps != [len(program) - 2] or program[-1] != 0):
+        raise ValueError("Program isn't a single loop")
+    lines = []
+    for pc in range(0, len(program) - 2 * len(jumps), 2):
+        operator, operand = program[pc:pc+2]
+        if operator in combo_opcodes and operand >= len(combo_sources):
+            raise ValueError(f"Invalid combo operand {operand} at {pc}")
+        combo = combo_sources[operand] if operand < len(combo_sources) else None
+        lines.extend(sources[operator].format(combo=combo, literal=operand).split("\n"))
+    return lines, len(jumps) > 0
+
+
+def compile_program(program):
+    # Returns a function taking A, B and C and returning the output, equivalent to Machine.run()
+    body, loops = compile_body(program)
+    lines = ["def run(A, B, C):", "    output = []"]
+    if loops:
+        lines.append("    while True:")
+        lines.extend(f"        {line}" for line in body)
+        lines.append("        if A == 0:")
+        lines.append("            return output")
+    else:
+        lines.extend(f"    {line}" for line in body)
+        lines.append("    return output")
+    source = "\n".join(lines)
+    namespace = {}
+    exec(compile(source, "<day17 program>", "exec"), namespace)
+    run = namespace["run"]
+    run.source = source
+    return run
+
+
+def compile_batch(program):
+    # Returns a function taking numpy arrays of A, B and C values and returning the values of A that
+    # make the program output itself. Candidates are dropped as soon as they output something wrong.
+    import numpy as np
+    body, loops = compile_body(program, batch_sources)
+    lines = ["def run(A, B, C):", "    index = A.copy()", "    count = 0", "    found = []"]
+    if loops:
+        lines.append("    while len(A) > 0:")
+        lines.extend(f"        {line}" for line in body)
+        lines.append("        done = A == 0")
+        lines.append(f"        if count == {len(program)}:")
+        lines.append("            found.append(index[done])")
+        lines.append("        A, B, C, index = A[~done], B[~done], C[~done], index[~done]")
+    else:
+        lines.extend(f"    {line}" for line in body)
+        lines.append(f"    if count == {len(program)}:")
+        lines.append("        found.append(index)")
+    lines.append("    return np.concatenate(found) if found else index[:0]")
+    source = "\n".join(lines)
+    expected = np.array(program, dtype=np.uint64)
+
+    def shift(values, amount):
+        amount = np.broadcast_to(np.asarray(amount, dtype=np.uint64), values.shape)
+        return np.where(amount >= 64, np.uint64(0), values >> np.minimum(amount, np.uint64(63)))
+
+    def register(value, A):
+        return np.broadcast_to(np.asarray(value, dtype=np.uint64), A.shape)
+
+    def keep_matching(A, B, C, index, value, count):
+        if count >= len(expected):
+            keep = np.zeros(A.shape, dtype=bool)
+        else:
+            keep = np.broadcast_to(np.asarray(value, dtype=np.uint64) % np.uint64(8), A.shape) == expected[count]
+        return A[keep], B[keep], C[keep], index[keep]
+
+    namespace = {"np": np, "shift": shift, "register": register, "keep_matching": keep_matching}
+    exec(compile(source, "<day17 batch program>", "exec"), namespace)
+    run = namespace["run"]
+    run.source = source
+    return run
+
+
+def loop_shift(program):
+    # How many bits each time round the loop shifts off A, if that's the only thing that changes A
+    shifts = [operand for operator, operand in zip(program[::2], program[1::2]) if operator == 0]
+    if len(shifts) != 1 or shifts[0] > 3:
+        return None
+    return shifts[0]
+
+
+def find_quine(machine):
+    # Each time round the loop outputs one value and shifts a few bits off A, so the last output only
+    # depends on the top bits of A, the one before that on the next few bits as well, and so on. Working
+    # back from the last output, try every value for the next digit of A and keep the ones that give
+    # the right end of the program. Returns None if the program doesn't have that shape.
+    program = machine.program
+    shift = loop_shift(program)
+    if shift is None or shift == 0:
+        return None
+    try:
+        run = compile_program(program)
+    except ValueError:
+        return None
+
+    def search(A, remaining):
+        if remaining == 0:
+            return A
+        expected = program[remaining-1:]
+        for digit in range(2**shift):
+            candidate = (A << shift) + digit
+            if candidate != 0 and run(candidate, machine.startB, machine.startC) == expected:
+                result = search(candidate, remaining - 1)
+                if result is not None:
+                    return result
+        return None
+
+    return search(0, len(program))
+
+
 class Machine:
     def __init__(self, A,B,C, program):
         self.A = A
@@ -83,8 +227,9 @@ class Machine:
     def run(self, quine=False):
         while self.pc <= len(self.program)-1:
             operator, operand = self.program[self.pc:self.pc+2]
-            dbg.print('\n')
-            dbg.print(opcodes[operator].__name__, operand if operator not in combo_opcodes else combo(self, operand))
+            if dbg.enabled():
+                dbg.print('\n')
+                dbg.print(opcodes[operator].__name__, operand if operator not in combo_opcodes else combo(self, operand))
             #input()
             opcodes[operator](self, operand)
             dbg.print(self)
@@ -97,6 +242,20 @@ class Machine:
             return self.output == self.program
         return self.output
 
+    def find_quine_batch(self, start=1, chunk_size=1 << 20):
+        # Brute force over A for programs find_quine() can't handle, a chunk of candidates at a time
+        import numpy as np
+        run = compile_batch(self.program)
+        while start < 2**64:
+            stop = min(start + chunk_size, 2**64)
+            A = np.arange(start, stop, dtype=np.uint64)
+            found = run(A, np.full(A.shape, self.startB, dtype=np.uint64), np.full(A.shape, self.startC, dtype=np.uint64))
+            if len(found) > 0:
+                return int(found.min())
+            dbg.printf("Tried A up to {}", stop)
+            start = stop
+        return None
+
     def reset(self):
         self.A = self.startA
         self.B = self.startB
@@ -124,6 +283,14 @@ def problem(input_file, part2=False):
         machine = Machine.from_file(file)
 
     if part2:
+        A = find_quine(machine)
+        if A is not None:
+            return A
+        try:
+            return machine.find_quine_batch()
+        except (ImportError, ValueError):
+            # No numpy, or a program compile_batch() can't handle
+            pass
         A = 0
         while True:
             machine.reset()
@@ -0,0 +1,53 @@
+import random
+import pytest
+from main import Machine, compile_batch, compile_program, find_quine, problem
+
+# Shifts A by B, which was loaded from a literal, so find_quine() can't handle it and part 2 has to
+# go through the batch brute force
+LITERAL_BST_PROGRAM = [2, 3, 0, 5, 5, 4, 3, 0]
+QUINE_PROGRAM = [2, 4, 1, 1, 7, 5, 4, 6, 1, 4, 0, 3, 5, 5, 3, 0]
+QUINE = 202366627359274
+
+
+def write_input(tmp_path, program, A=0):
+    path = tmp_path / 'input.txt'
+    path.write_text(f"Register A: {A}\nRegister B: 0\nRegister C: 0\n\nProgram: {','.join(map(str, program))}\n")
+    return str(path)
+
+
+def test_find_quine(tmp_path):
+    with open(write_input(tmp_path, QUINE_PROGRAM)) as file:
+        assert find_quine(Machine.from_file(file)) == QUINE
+    with open(write_input(tmp_path, LITERAL_BST_PROGRAM)) as file:
+        assert find_quine(Machine.from_file(file)) is None
+
+
+def test_compiled_matches_machine():
+    rng = random.Random(0)
+    for program in (QUINE_PROGRAM, LITERAL_BST_PROGRAM):
+        run = compile_program(program)
+        for A in [QUINE] + [rng.randrange(1, 2**48) for _ in range(200)]:
+            assert run(A, 0, 0) == Machine(A, 0, 0, program).run()
+
+
+def test_literal_bst_goes_through_batch(tmp_path):
+    pytest.importorskip("numpy")
+    A = problem(write_input(tmp_path, LITERAL_BST_PROGRAM), part2=True)
+    machine = Machine(A, 0, 0, LITERAL_BST_PROGRAM)
+    assert machine.run() == LITERAL_BST_PROGRAM
+    # Nothing smaller works either
+    for smaller in range(max(1, A - 1000), A):
+        machine = Machine(smaller, 0, 0, LITERAL_BST_PROGRAM)
+        assert machine.run() != LITERAL_BST_PROGRAM
+
+
+def test_batch_matches_machine():
+    np = pytest.importorskip("numpy")
+    rng = random.Random(0)
+    run = compile_batch(QUINE_PROGRAM)
+    # The quine and its neighbours, some of which are quines too, and random values that aren't
+    values = list(range(QUINE - 50, QUINE + 50)) + [rng.randrange(1, 2**48) for _ in range(1000)]
+    candidates = np.array(values, dtype=np.uint64)
+    found = set(int(value) for value in run(candidates, candidates * 0, candidates * 0))
+    for value in candidates:
+        assert (Machine(int(value), 0, 0, QUINE_PROGRAM).run() == QUINE_PROGRAM) == (int(value) in found)
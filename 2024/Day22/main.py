@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 import argparse
-from aoc_util import dbg
+from aoc_util import dbg, parse_file
 import itertools
 from collections import defaultdict
 
@@ -33,39 +33,11 @@ def evolve(number):
     number = prune(mix(number * 2048, number))
     return number
 
-def problem(input_file, part2=False):
-    with open(input_file, 'r') as file:
-        numbers = [int(line.strip()) for line in file]
-
-
-    if part2:
-        size = 4
-        sequences = itertools.product(range(-9,10), repeat=size)
-#        print([sequence for sequence in sequences])
-
-        results = defaultdict(lambda: defaultdict(lambda: None))
-        for i,number in enumerate(numbers):
-            init = number
-            last = init % 10
-            changes = CircularArray(size)
-            for j in range(2000):
-                number = evolve(number)
-                price = number % 10
-                changes.add(price - last)
-                dbg.print(f"{number}: {price} {changes.last()}")
-                if j >= 4:
-                    seq = changes.as_tuple()
-                    if results[seq][i] is None:
-                        results[seq][i] = price
-                last = price
-
-        best = 0
-        for result in results.values():
-            total = sum(v for v in result.values() if v is not None)
-            if total > best:
-                best = total
-        return best
+def parse(file):
+    return tuple(int(line.strip()) for line in file)
+
 
+def part1(numbers):
     total = 0
     for number in numbers:
         init = number
@@ -80,6 +52,36 @@ def problem(input_file, part2=False):
     return total
 
 
+def part2(numbers):
+    size = 4
+    sequences = itertools.product(range(-9,10), repeat=size)
+#    print([sequence for sequence in sequences])
+
+    results = defaultdict(lambda: defaultdict(lambda: None))
+    for i,number in enumerate(numbers):
+        init = number
+        last = init % 10
+        changes = CircularArray(size)
+        for j in range(2000):
+            number = evolve(number)
+            price = number % 10
+            changes.add(price - last)
+            if dbg.enabled():
+                dbg.print(f"{number}: {price} {changes.last()}")
+            if j >= 4:
+                seq = changes.as_tuple()
+                if results[seq][i] is None:
+                    results[seq][i] = price
+            last = price
+
+    best = 0
+    for result in results.values():
+        total = sum(v for v in result.values() if v is not None)
+        if total > best:
+            best = total
+    return best
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('filename', nargs='?', default='input.txt')
@@ -87,6 +89,6 @@ if __name__ == "__main__":
     args = parser.parse_args()
     dbg.set_level(args.verbose)
 
-    print(problem(args.filename))
-    print(problem(args.filename, part2=True))
-
+    numbers = parse_file(parse, args.filename)
+    print(part1(numbers))
+    print(part2(numbers))
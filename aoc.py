@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import concurrent.futures.process
+import contextlib
+import importlib.util
+import io
+import json
+import math
+import os
+import re
+import signal
+import statistics
+import sys
+import time
+import tracemalloc
+
+import aoc_util
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DAY_DIR_PATTERN = re.compile(r'Day(\d+)$')
+BASELINE_FILE = os.path.join(ROOT, 'benchmarks.json')
+
+
+class Day:
+    def __init__(self, year, day, path):
+        self.year = year
+        self.day = day
+        self.path = path
+        self.module = None
+        self.parsed = {}
+
+    @property
+    def name(self):
+        return f'{self.year}/Day{self.day:02}'
+
+    @property
+    def input_file(self):
+        return os.path.join(self.path, 'input.txt')
+
+    def has_input(self):
+        return os.path.exists(self.input_file)
+
+    def load(self):
+        if self.module is not None:
+            return self.module
+        # Days import shared modules from the repo root (aoc_util, search, astar) and from their
+        # year directory (intcode), and occasionally helpers that sit next to their main.py
+        year_path = os.path.dirname(self.path)
+        for path in (ROOT, year_path):
+            if path not in sys.path:
+                sys.path.append(path)
+        sys.path.insert(0, self.path)
+        try:
+            spec = importlib.util.spec_from_file_location(f'aoc_{self.year}_day{self.day:02}', os.path.join(self.path, 'main.py'))
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[spec.name] = module
+            with contextlib.redirect_stdout(io.StringIO()):
+                spec.loader.exec_module(module)
+        finally:
+            sys.path.remove(self.path)
+        self.module = module
+        return module
+
+    def parse(self, input_file):
+        model = aoc_util.parse_file(self.load().parse, input_file)
+        self.parsed[os.path.abspath(input_file)] = model
+        return model
+
+    def model(self, input_file):
+        try:
+            return self.parsed[os.path.abspath(input_file)]
+        except KeyError:
+            return self.parse(input_file)
+
+    def parts(self):
+        # Returns (part, function) pairs where each function takes the input file name
+        module = self.load()
+        if hasattr(module, 'parse'):
+            # Days split into parse/part1/part2 only parse once, and both parts share the model
+            return [
+                ('parse', self.parse),
+                (1, lambda input_file: module.part1(self.model(input_file))),
+                (2, lambda input_file: module.part2(self.model(input_file))),
+            ]
+        if hasattr(module, 'problem'):
+            return [
+                (1, lambda input_file: module.problem(input_file)),
+                (2, lambda input_file: module.problem(input_file, part2=True)),
+            ]
+        result = []
+        for part in (1, 2):
+            function = getattr(module, f'part{part}', None)
+            if function is not None:
+                result.append((part, function))
+        return result
+
+    def __repr__(self):
+        return f'Day({self.year}, {self.day})'
+
+
+class SolverTimeout(Exception):
+    pass
+
+
+def raise_timeout(signum, frame):
+    raise SolverTimeout('Solver took too long')
+
+
+class PartResult:
+    def __init__(self, day, part, answer=None, wall=None, cpu=None, peak_memory=None, error=None):
+        self.day = day
+        self.part = part
+        self.answer = answer
+        self.wall = wall
+        self.cpu = cpu
+        self.peak_memory = peak_memory
+        self.error = error
+
+    @property
+    def key(self):
+        return f'{self.day.name}/{self.part}'
+
+    @property
+    def name(self):
+        if self.part is None:
+            return self.day.name
+        if self.part == 'parse':
+            return f'{self.day.name} parse'
+        return f'{self.day.name} part {self.part}'
+
+
+def discover(years=None, days=None):
+    result = []
+    for year in sorted(os.listdir(ROOT)):
+        year_path = os.path.join(ROOT, year)
+        if not year.isdigit() or not os.path.isdir(year_path):
+            continue
+        if years and int(year) not in years:
+            continue
+        for day_dir in sorted(os.listdir(year_path)):
+            match = DAY_DIR_PATTERN.match(day_dir)
+            day_path = os.path.join(year_path, day_dir)
+            if match is None or not os.path.exists(os.path.join(day_path, 'main.py')):
+                continue
+            day = int(match.group(1))
+            if days and day not in days:
+                continue
+            result.append(Day(int(year), day, day_path))
+    return result
+
+
+def run_part(day, part, function, input_file='input.txt', trace_memory=True, show_output=False, timeout=None):
+    result = PartResult(day, part)
+    cwd = os.getcwd()
+    output = sys.stdout if show_output else io.StringIO()
+    # Solvers are run from their own directory, the same as when running main.py by hand
+    os.chdir(day.path)
+    if trace_memory:
+        tracemalloc.start()
+    if timeout:
+        signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        with contextlib.redirect_stdout(output):
+            result.answer = function(input_file)
+    except Exception as e:
+        result.error = f'{e.__class__.__name__}: {e}'
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        result.cpu = time.process_time() - cpu_start
+        result.wall = time.perf_counter() - wall_start
+        if trace_memory:
+            _, result.peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        os.chdir(cwd)
+    return result
+
+
+def run_day(day, parts=None, trace_memory=True, show_output=False, timeout=None):
+    try:
+        solvers = day.parts()
+    except Exception as e:
+        return [PartResult(day, None, error=f'{e.__class__.__name__}: {e}')]
+    results = []
+    for part, function in solvers:
+        if parts and part not in parts and part != 'parse':
+            continue
+        results.append(run_part(day, part, function, trace_memory=trace_memory, show_output=show_output, timeout=timeout))
+    return results
+
+
+# Each worker process imports a day at most once, no matter how many of its parts it is sent
+worker_days = {}
+
+
+def run_task(year, day_number, path, part, trace_memory=True, timeout=None):
+    day = worker_days.get(path)
+    if day is None:
+        day = worker_days[path] = Day(year, day_number, path)
+    try:
+        solvers = dict(day.parts())
+    except Exception as e:
+        result = PartResult(day, part, error=f'{e.__class__.__name__}: {e}')
+    else:
+        if part not in solvers:
+            return None
+        result = run_part(day, part, solvers[part], trace_memory=trace_memory, timeout=timeout)
+    # Loaded modules can't be pickled, so send back a Day that hasn't been loaded
+    result.day = Day(year, day_number, path)
+    return result
+
+
+def run_parallel(days, jobs, parts=None, trace_memory=True, timeout=None, baseline=None):
+    if baseline is None:
+        baseline = {}
+    tasks = [(day, part) for day in days for part in (1, 2) if not parts or part in parts]
+    # Start the slowest parts first so they don't end up as the tail of the batch. Parts without a
+    # baseline time might be slow too, so those go first of all.
+    def expected_time(task):
+        day, part = task
+        previous = baseline.get(f'{day.name}/{part}')
+        return float('inf') if previous is None else previous['median']
+    tasks.sort(key=expected_time, reverse=True)
+
+    broken = []
+    yield from run_pool(tasks, jobs, broken, trace_memory, timeout)
+    # Most broken tasks were only caught up in some other task's crash, so they get another go
+    # together. Whatever breaks again is run on its own to find the ones that actually crash.
+    if broken:
+        tasks, broken = broken, []
+        yield from run_pool(tasks, jobs, broken, trace_memory, timeout)
+    for day, part in broken:
+        crashed = []
+        yield from run_pool([(day, part)], 1, crashed, trace_memory, timeout)
+        if crashed:
+            yield PartResult(day, part, error='Worker process died')
+
+
+def run_pool(tasks, jobs, broken, trace_memory=True, timeout=None):
+    # A worker dying (a crash in C code, being killed for using too much memory, ...) breaks the whole
+    # pool and every task that hadn't finished yet fails with it. Those are added to broken instead.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(run_task, day.year, day.day, day.path, part, trace_memory, timeout): (day, part) for day,part in tasks}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+            except concurrent.futures.process.BrokenProcessPool:
+                broken.append(futures[future])
+                continue
+            if result is not None:
+                yield result
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return '-'
+    if seconds < 1:
+        return f'{seconds * 1000:.1f}ms'
+    return f'{seconds:.2f}s'
+
+
+def format_memory(size):
+    if size is None:
+        return '-'
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f'{size:.0f}{unit}'
+        size /= 1024
+    return f'{size:.1f}GiB'
+
+
+part_order = {None: -1, 'parse': 0}
+
+
+sort_keys = {
+    'day': lambda result: (result.day.year, result.day.day, part_order.get(result.part, result.part)),
+    'wall': lambda result: -(result.wall or 0),
+    'cpu': lambda result: -(result.cpu or 0),
+    'memory': lambda result: -(result.peak_memory or 0),
+}
+
+
+def print_table(results, sort='day', answer_width=30):
+    rows = [('day', 'part', 'answer', 'wall', 'cpu', 'peak mem')]
+    for result in sorted(results, key=sort_keys[sort]):
+        if result.error is not None:
+            answer = f'! {result.error}'
+        elif result.part == 'parse':
+            answer = ''
+        else:
+            answer = str(result.answer)
+        if len(answer) > answer_width:
+            answer = answer[:answer_width-3] + '...'
+        rows.append((result.day.name, str(result.part or '-'), answer, format_duration(result.wall), format_duration(result.cpu), format_memory(result.peak_memory)))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print('  '.join(cell.ljust(width) if i < 3 else cell.rjust(width) for i,(cell,width) in enumerate(zip(row, widths))))
+
+
+def run(args):
+    days = []
+    for day in discover(args.years, args.days):
+        if not day.has_input():
+            print(f'{day.name}: no input.txt, skipping', file=sys.stderr)
+            continue
+        days.append(day)
+
+    trace_memory = not args.no_memory
+    if args.jobs > 1:
+        stream = run_parallel(days, args.jobs, args.parts, trace_memory, args.timeout, load_baseline(args.baseline))
+    else:
+        stream = (result for day in days for result in run_day(day, args.parts, trace_memory, args.show_output, args.timeout))
+
+    results = []
+    for result in stream:
+        results.append(result)
+        print(f'{result.name}: {result.error or format_duration(result.wall)}', file=sys.stderr)
+    print_table(results, args.sort)
+    return results
+
+
+class Benchmark:
+    def __init__(self, key, times):
+        self.key = key
+        self.times = sorted(times)
+
+    @property
+    def median(self):
+        return statistics.median(self.times)
+
+    @property
+    def p95(self):
+        # Nearest-rank percentile so small sample counts still report a time that was measured
+        return self.times[math.ceil(0.95 * len(self.times)) - 1]
+
+    def as_dict(self):
+        return {'median': self.median, 'p95': self.p95, 'runs': len(self.times)}
+
+
+def benchmark_day(day, parts=None, repeat=5, warmup=1):
+    try:
+        solvers = day.parts()
+    except Exception as e:
+        return [], [PartResult(day, None, error=f'{e.__class__.__name__}: {e}')]
+    benchmarks = []
+    errors = []
+    for part, function in solvers:
+        if parts and part not in parts and part != 'parse':
+            continue
+        times = []
+        for i in range(warmup + repeat):
+            result = run_part(day, part, function, trace_memory=False)
+            if result.error is not None:
+                errors.append(result)
+                break
+            if i >= warmup:
+                times.append(result.wall)
+        else:
+            benchmarks.append(Benchmark(result.key, times))
+    return benchmarks, errors
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, baseline):
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def bench(args):
+    baseline = load_baseline(args.baseline)
+    rows = [('day/part', 'median', 'p95', 'baseline', 'change', '')]
+    regressions = []
+    benchmarks = []
+    for day in discover(args.years, args.days):
+        if not day.has_input():
+            continue
+        day_benchmarks, errors = benchmark_day(day, args.parts, args.repeat, args.warmup)
+        for error in errors:
+            print(f'{error.name}: {error.error}', file=sys.stderr)
+        for benchmark in day_benchmarks:
+            benchmarks.append(benchmark)
+            print(f'{benchmark.key}: {format_duration(benchmark.median)}', file=sys.stderr)
+            previous = baseline.get(benchmark.key)
+            if previous is None:
+                rows.append((benchmark.key, format_duration(benchmark.median), format_duration(benchmark.p95), '-', '-', 'new'))
+                continue
+            change = benchmark.median / previous['median'] - 1
+            flag = ''
+            # Very fast parts are mostly timer noise, so they can't count as a regression
+            if change > args.threshold and benchmark.median - previous['median'] > args.min_delta:
+                flag = 'SLOWER'
+                regressions.append(benchmark)
+            elif change < -args.threshold:
+                flag = 'faster'
+            rows.append((benchmark.key, format_duration(benchmark.median), format_duration(benchmark.p95), format_duration(previous['median']), f'{change:+.1%}', flag))
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print('  '.join(cell.ljust(width) if i in (0, 5) else cell.rjust(width) for i,(cell,width) in enumerate(zip(row, widths))))
+
+    if args.save:
+        for benchmark in benchmarks:
+            baseline[benchmark.key] = benchmark.as_dict()
+        save_baseline(args.baseline, baseline)
+        print(f'Saved {len(benchmarks)} results to {args.baseline}', file=sys.stderr)
+
+    if len(regressions) > 0:
+        print(f'{len(regressions)} parts got slower than the baseline by more than {args.threshold:.0%}', file=sys.stderr)
+        sys.exit(1)
+
+
+def add_selection_arguments(parser):
+    parser.add_argument('years', nargs='*', type=int, help='Years to run (default: all)')
+    parser.add_argument('-d', '--day', dest='days', action='append', type=int, help='Only run this day (may be repeated)')
+    parser.add_argument('-p', '--part', dest='parts', action='append', type=int, choices=(1, 2), help='Only run this part')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--cache', action='store_true', help='Reuse parsed inputs from previous runs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run every day once and time each part')
+    add_selection_arguments(run_parser)
+    run_parser.add_argument('-s', '--sort', choices=sort_keys.keys(), default='day')
+    run_parser.add_argument('--show-output', action='store_true', help="Don't hide what the solvers print")
+    run_parser.add_argument('--no-memory', action='store_true', help='Skip peak memory tracking, which slows solvers down')
+    run_parser.add_argument('-j', '--jobs', type=int, default=1, help='Run parts in this many worker processes, slowest first')
+    run_parser.add_argument('--timeout', type=float, help="Give up on a part after this many seconds. Uses SIGALRM, so POSIX "
+                            "only, and it can't interrupt a solver stuck inside one long call into C code")
+    run_parser.add_argument('--baseline', default=BASELINE_FILE, help='Benchmark results used to order parallel runs')
+    run_parser.set_defaults(function=run)
+
+    bench_parser = subparsers.add_parser('bench', help='Time every day several times and compare against the saved baseline')
+    add_selection_arguments(bench_parser)
+    bench_parser.add_argument('-n', '--repeat', type=int, default=5, help='Timed runs per part')
+    bench_parser.add_argument('-w', '--warmup', type=int, default=1, help='Untimed runs per part before timing')
+    bench_parser.add_argument('-t', '--threshold', type=float, default=0.1, help='Fraction a median can grow by before it counts as a regression')
+    bench_parser.add_argument('--min-delta', type=float, default=0.001, help='Seconds a median must grow by before it counts as a regression')
+    bench_parser.add_argument('--baseline', default=BASELINE_FILE)
+    bench_parser.add_argument('--save', action='store_true', help='Store these results as the new baseline')
+    bench_parser.set_defaults(function=bench)
+
+    args = parser.parse_args()
+    if getattr(args, 'timeout', None) and not hasattr(signal, 'SIGALRM'):
+        parser.error('--timeout needs SIGALRM, which this platform does not have')
+    if args.cache:
+        aoc_util.enable_parse_cache()
+    args.function(args)
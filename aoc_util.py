@@ -1,4 +1,12 @@
+import bisect
 import enum
+import hashlib
+import heapq
+import importlib
+import io
+import os
+import pickle
+import sys
 
 digits = [str(i) for i in range(0,10)] + [chr(c) for c in range(ord('A'), ord('Z')+1)]
 
@@ -9,12 +17,113 @@ class Debugger:
     def set_level(self, level):
         self.debug_level = level
 
+    def enabled(self, level=1):
+        return self.debug_level >= level
+
+    # Arguments that are callables are only called if the message is actually printed,
+    # so expensive messages can be passed as e.g. lambda: f"{state}" from inside hot loops
     def print(self, *args, level=1, **kwargs):
         if self.debug_level >= level:
-            print(*args, **kwargs)
+            print(*(arg() if callable(arg) else arg for arg in args), **kwargs)
+
+    def printf(self, message, *args, level=1, **kwargs):
+        if self.debug_level >= level:
+            print(message.format(*args), **kwargs)
 
 dbg = Debugger()
 
+
+PARSE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.parse_cache')
+parse_cache_dir = None
+
+
+def enable_parse_cache(directory=PARSE_CACHE_DIR):
+    global parse_cache_dir
+    parse_cache_dir = directory
+    os.makedirs(directory, exist_ok=True)
+
+
+def source_digest(module_name):
+    # Hash of the file a module was loaded from, or None for builtins and anything else without one
+    module = sys.modules.get(module_name)
+    if module is None:
+        module = importlib.import_module(module_name)
+    source = getattr(module, '__file__', None)
+    if source is None:
+        return None
+    with open(source, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def parse_cache_key(parse, input_file, version=None):
+    # The key covers the input, an explicit version tag, and the file the parser is defined in,
+    # so editing either the input or the day's code invalidates the cached model. Modules whose
+    # classes end up in the model are checked separately, see DependencyPickler.
+    key = hashlib.sha256()
+    with open(input_file, 'rb') as file:
+        key.update(file.read())
+    key.update(f'\0{parse.__module__}.{parse.__qualname__}\0{version}\0'.encode())
+    digest = source_digest(parse.__module__)
+    key.update(digest.encode() if digest is not None else parse.__code__.co_code)
+    return key.hexdigest()
+
+
+class DependencyPickler(pickle.Pickler):
+    # Records the module of every class pickled, so a cached model made of e.g. Grids or Intcode
+    # memories goes stale when aoc_util.py or intcode.py changes, not just the day's own code
+    def __init__(self, file):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.modules = set()
+
+    def persistent_id(self, obj):
+        self.modules.add((obj if isinstance(obj, type) else type(obj)).__module__)
+        return None
+
+
+def load_cached(path):
+    # The cached model, or None if there isn't one or it's out of date. Anything that goes wrong
+    # loading it (a class that was renamed or moved, a truncated file, ...) just means parsing again.
+    try:
+        with open(path, 'rb') as file:
+            sources, data = pickle.load(file)
+        # Checked before loading the model, whose classes might not match what was pickled any more
+        if all(source_digest(name) == digest for name, digest in sources.items()):
+            return pickle.loads(data)
+    except Exception:
+        pass
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return None
+
+
+def parse_file(parse, input_file, version=None):
+    if parse_cache_dir is None:
+        with open(input_file, 'r') as file:
+            return parse(file)
+
+    path = os.path.join(parse_cache_dir, f'{parse_cache_key(parse, input_file, version)}.pickle')
+    model = load_cached(path)
+    if model is not None:
+        return model
+
+    with open(input_file, 'r') as file:
+        model = parse(file)
+    buffer = io.BytesIO()
+    pickler = DependencyPickler(buffer)
+    try:
+        pickler.dump(model)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        # Some models hold lambdas or open files, those just don't get cached
+        return model
+    sources = {name: source_digest(name) for name in pickler.modules}
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        pickle.dump((sources, buffer.getvalue()), file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+    return model
+
 class InclusiveRange:
     def __init__(self, min, max):
         self.min = min
@@ -42,6 +151,171 @@ class InclusiveRange:
         return f'InclusiveRange({self.min}, {self.max})'
 
 
+# A set of integers stored as sorted, non-overlapping, non-adjacent half-open [start, stop) intervals.
+# The starts and stops are kept in two parallel lists so lookups can bisect them directly.
+class RangeSet:
+    def __init__(self, ranges=()):
+        self.starts = []
+        self.stops = []
+        for start, stop in sorted(ranges):
+            self._append(start, stop)
+
+    def _append(self, start, stop):
+        # Only valid for ranges that start at or after every range already in the set
+        if start >= stop:
+            return
+        if len(self.stops) > 0 and start <= self.stops[-1]:
+            self.stops[-1] = max(self.stops[-1], stop)
+        else:
+            self.starts.append(start)
+            self.stops.append(stop)
+
+    @classmethod
+    def _from_sorted(cls, ranges):
+        result = cls()
+        for start, stop in ranges:
+            result._append(start, stop)
+        return result
+
+    def add(self, start, stop):
+        if start >= stop:
+            return
+        # Every range from i up to j touches [start, stop) and gets merged with it
+        i = bisect.bisect_left(self.stops, start)
+        j = bisect.bisect_right(self.starts, stop)
+        if i < j:
+            start = min(start, self.starts[i])
+            stop = max(stop, self.stops[j-1])
+        self.starts[i:j] = [start]
+        self.stops[i:j] = [stop]
+
+    def remove(self, start, stop):
+        if start >= stop:
+            return
+        i = bisect.bisect_right(self.stops, start)
+        j = bisect.bisect_left(self.starts, stop)
+        if i >= j:
+            return
+        starts = []
+        stops = []
+        if self.starts[i] < start:
+            starts.append(self.starts[i])
+            stops.append(start)
+        if self.stops[j-1] > stop:
+            starts.append(stop)
+            stops.append(self.stops[j-1])
+        self.starts[i:j] = starts
+        self.stops[i:j] = stops
+
+    def union(self, other):
+        return RangeSet._from_sorted(heapq.merge(self, other))
+
+    def intersection(self, other):
+        result = RangeSet()
+        i = 0
+        j = 0
+        while i < len(self.starts) and j < len(other.starts):
+            start = max(self.starts[i], other.starts[j])
+            stop = min(self.stops[i], other.stops[j])
+            if start < stop:
+                result.starts.append(start)
+                result.stops.append(stop)
+            if self.stops[i] < other.stops[j]:
+                i += 1
+            else:
+                j += 1
+        return result
+
+    def difference(self, other):
+        result = RangeSet()
+        j = 0
+        for start, stop in self:
+            # other's ranges that end before this one starts can't cut into this or any later one
+            while j < len(other.starts) and other.stops[j] <= start:
+                j += 1
+            k = j
+            while k < len(other.starts) and other.starts[k] < stop:
+                result._append(start, other.starts[k])
+                start = max(start, other.stops[k])
+                k += 1
+            result._append(start, stop)
+        return result
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def split(self, value):
+        # Returns the values below value and the values at or above it
+        i = bisect.bisect_right(self.stops, value)
+        below = RangeSet._from_sorted(zip(self.starts[:i], self.stops[:i]))
+        above = RangeSet._from_sorted(zip(self.starts[i:], self.stops[i:]))
+        if i < len(self.starts) and self.starts[i] < value:
+            below._append(self.starts[i], value)
+            above.starts[0] = value
+        return below, above
+
+    def shift(self, offset):
+        return RangeSet._from_sorted((start + offset, stop + offset) for start, stop in self)
+
+    def map(self, pieces):
+        # pieces are (start, stop, offset) triples that must not overlap each other. Values inside
+        # a piece are moved by its offset and values outside every piece are left where they are.
+        pieces = sorted(piece for piece in pieces if piece[0] < piece[1])
+        result = []
+        j = 0
+        for start, stop in self:
+            while j < len(pieces) and pieces[j][1] <= start:
+                j += 1
+            # Walk the pieces this range overlaps, keeping the gaps between them as they are
+            k = j
+            while start < stop and k < len(pieces) and pieces[k][0] < stop:
+                piece_start, piece_stop, offset = pieces[k]
+                if start < piece_start:
+                    result.append((start, piece_start))
+                    start = piece_start
+                end = min(stop, piece_stop)
+                result.append((start + offset, end + offset))
+                start = end
+                k += 1
+            if start < stop:
+                result.append((start, stop))
+        return RangeSet(result)
+
+    def copy(self):
+        result = RangeSet()
+        result.starts = self.starts.copy()
+        result.stops = self.stops.copy()
+        return result
+
+    def contains(self, value):
+        i = bisect.bisect_right(self.starts, value) - 1
+        return i >= 0 and value < self.stops[i]
+
+    __contains__ = contains
+
+    def count(self):
+        return sum(stop - start for start, stop in self)
+
+    def min(self):
+        return self.starts[0]
+
+    def max(self):
+        return self.stops[-1] - 1
+
+    def __iter__(self):
+        return zip(self.starts, self.stops)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __eq__(self, other):
+        return self.starts == other.starts and self.stops == other.stops
+
+    def __repr__(self):
+        return f'RangeSet({list(self)})'
+
+
 class Cols:
     def __init__(self, data):
         self.data = data
@@ -84,42 +358,198 @@ class CardinalDirection(enum.Enum):
     WEST = 3
 
     def turn(self, relative_direction):
-        return CardinalDirection((self.value + relative_direction.value) % 4)
+        return DIRECTION_TURNS[relative_direction.value][self.value]
 
     def as_char(self):
-        if self == CardinalDirection.NORTH:
-            return '^'
-        elif self == CardinalDirection.EAST:
-            return '>'
-        elif self == CardinalDirection.SOUTH:
-            return 'v'
-        elif self == CardinalDirection.WEST:
-            return '<'
+        return DIRECTION_CHARS[self.value]
+
+    @property
+    def delta(self):
+        return DIRECTION_DELTAS[self.value]
+
+    def is_vertical(self):
+        return self.value % 2 == 0
+
+    def is_horizontal(self):
+        return self.value % 2 == 1
+
+    def mirror(self, mirror):
+        return DIRECTIONS[MIRRORS[mirror][self.value]]
 
     @staticmethod
     def from_char(char):
-        if char == 'U' or char == 'N':
-            return CardinalDirection.NORTH
-        elif char == 'D' or char == 'S':
-            return CardinalDirection.SOUTH
-        elif char == 'L' or char == 'W':
-            return CardinalDirection.WEST
-        elif char == 'R' or char == 'E':
-            return CardinalDirection.EAST
+        return CHAR_DIRECTIONS.get(char)
+
+    @staticmethod
+    def from_int(direction):
+        return DIRECTIONS[direction]
+
+
+# Lookup tables so hot loops can work with directions as plain ints 0-3 (the enum values)
+# instead of constructing enum members. DIRECTIONS maps those ints back to the enum.
+DIRECTIONS = tuple(CardinalDirection)
+DIRECTION_CHARS = '^>v<'
+CHAR_TO_INT = {'^': 0, 'U': 0, 'N': 0, '>': 1, 'R': 1, 'E': 1, 'v': 2, 'D': 2, 'S': 2, '<': 3, 'L': 3, 'W': 3}
+CHAR_DIRECTIONS = {char: DIRECTIONS[direction] for char,direction in CHAR_TO_INT.items()}
+
+# INT_TURNS[relative][direction] is the int direction after turning, where relative is a
+# RelativeDirection value (so LEFT = -1 indexes the last entry)
+INT_TURNS = tuple(tuple((direction + relative) % 4 for direction in range(4)) for relative in (0, 1, 2, -1))
+DIRECTION_TURNS = tuple(tuple(DIRECTIONS[direction] for direction in turns) for turns in INT_TURNS)
+
+# Direction a beam travelling in each direction leaves a / or \ mirror
+MIRRORS = {
+    '/': (1, 0, 3, 2),
+    '\\': (3, 2, 1, 0),
+}
+
+
+# Unit steps for each CardinalDirection, indexed by its value
+DIRECTION_DELTAS = ((0,-1), (1,0), (0,1), (-1,0))
 
 
 class Point(tuple):
-    def __new__(self, x, y):
-        return tuple.__new__(Point, (x,y))
-
-    def move(self, direction):
-        x,y = self
-        if direction == CardinalDirection.NORTH:
-            y -= 1
-        elif direction == CardinalDirection.EAST:
-            x += 1
-        elif direction == CardinalDirection.SOUTH:
-            y += 1
-        elif direction == CardinalDirection.WEST:
-            x -= 1
-        return Point(x,y)
+    __slots__ = ()
+
+    def __new__(cls, x, y):
+        return tuple.__new__(cls, (x,y))
+
+    @property
+    def x(self):
+        return self[0]
+
+    @property
+    def y(self):
+        return self[1]
+
+    def move(self, direction, distance=1):
+        dx,dy = DIRECTION_DELTAS[direction.value]
+        return tuple.__new__(Point, (self[0] + dx*distance, self[1] + dy*distance))
+
+    def step(self, direction):
+        # Same as move() for a direction given as an int
+        dx,dy = DIRECTION_DELTAS[direction]
+        return tuple.__new__(Point, (self[0] + dx, self[1] + dy))
+
+    def __add__(self, other):
+        return tuple.__new__(Point, (self[0] + other[0], self[1] + other[1]))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return tuple.__new__(Point, (self[0] - other[0], self[1] - other[1]))
+
+    def __rsub__(self, other):
+        return tuple.__new__(Point, (other[0] - self[0], other[1] - self[1]))
+
+    def __mul__(self, k):
+        return tuple.__new__(Point, (self[0] * k, self[1] * k))
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return tuple.__new__(Point, (-self[0], -self[1]))
+
+    def manhattan(self, other):
+        return abs(self[0] - other[0]) + abs(self[1] - other[1])
+
+    # Points inside a grid of known width can be packed into a single int, which is
+    # cheaper to hash and store than a tuple when used as a set member or dict key
+    def pack(self, width):
+        return self[1] * width + self[0]
+
+    @classmethod
+    def unpack(cls, packed, width):
+        y,x = divmod(packed, width)
+        return tuple.__new__(cls, (x,y))
+
+
+class Grid:
+    def __init__(self, rows, pad='\0'):
+        self.height = len(rows)
+        self.width = len(rows[0]) if rows else 0
+        # Short rows would have to be filled with the pad, which reads as out of bounds, so cells
+        # inside the grid would act like walls
+        for y, row in enumerate(rows):
+            if len(row) != self.width:
+                raise ValueError(f"Row {y} has {len(row)} cells, expected {self.width}")
+        # Every row is padded by one cell on each side and there is a padding row above and below,
+        # so a single step from any real cell lands on a valid index and no bounds check is needed.
+        self.stride = self.width + 2
+        self.pad = ord(pad)
+        padded = [pad * self.stride]
+        for row in rows:
+            padded.append(f'{pad}{row}{pad}')
+        padded.append(pad * self.stride)
+        self.data = bytearray(''.join(padded), 'latin-1')
+        # Index deltas for a single step, indexed by CardinalDirection.value
+        self.deltas = (-self.stride, 1, self.stride, -1)
+
+    def index(self, point):
+        x,y = point
+        return (y+1) * self.stride + x + 1
+
+    def point(self, index):
+        y,x = divmod(index, self.stride)
+        return Point(x-1, y-1)
+
+    def in_bounds(self, index):
+        return self.data[index] != self.pad
+
+    def at(self, point):
+        x,y = point
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            return None
+        return chr(self.data[self.index(point)])
+
+    def set(self, point, char):
+        self.data[self.index(point)] = ord(char)
+
+    def step(self, index, direction):
+        return index + self.deltas[direction.value]
+
+    def neighbors(self, index):
+        data = self.data
+        pad = self.pad
+        return [index + delta for delta in self.deltas if data[index + delta] != pad]
+
+    def cells(self):
+        for y in range(self.height):
+            start = (y+1) * self.stride + 1
+            yield from range(start, start + self.width)
+
+    def find(self, char):
+        index = self.data.find(ord(char))
+        return None if index < 0 else index
+
+    def find_all(self, char):
+        value = ord(char)
+        result = []
+        index = self.data.find(value)
+        while index >= 0:
+            result.append(index)
+            index = self.data.find(value, index+1)
+        return result
+
+    def copy(self):
+        result = Grid.__new__(Grid)
+        result.__dict__.update(self.__dict__)
+        result.data = bytearray(self.data)
+        return result
+
+    def __str__(self):
+        rows = []
+        for y in range(self.height):
+            start = (y+1) * self.stride + 1
+            rows.append(self.data[start:start+self.width].decode('latin-1'))
+        return '\n'.join(rows)
+
+    @classmethod
+    def from_file(cls, file, pad='\0'):
+        rows = []
+        for line in file:
+            line = line.rstrip('\n')
+            if len(line) == 0:
+                break
+            rows.append(line)
+        return cls(rows, pad)
@@ -0,0 +1,119 @@
+import heapq
+import itertools
+
+
+class PathDAG:
+    # Every optimal path from start to a goal, stored as the predecessor lists of each node rather
+    # than as separate paths, since the number of paths can grow exponentially with the maze size
+    def __init__(self, start, goals, came_from, cost):
+        self.start = start
+        self.goals = goals
+        self.came_from = came_from
+        self.cost = cost
+
+    def nodes(self):
+        result = set(self.goals)
+        stack = list(self.goals)
+        while len(stack) > 0:
+            node = stack.pop()
+            for previous in self.came_from[node]:
+                if previous not in result:
+                    result.add(previous)
+                    stack.append(previous)
+        return result
+
+    def count(self):
+        counts = {self.start: 1}
+        stack = list(self.goals)
+        while len(stack) > 0:
+            node = stack[-1]
+            if node in counts:
+                stack.pop()
+                continue
+            missing = [previous for previous in self.came_from[node] if previous not in counts]
+            if len(missing) > 0:
+                stack.extend(missing)
+            else:
+                counts[node] = sum(counts[previous] for previous in self.came_from[node])
+                stack.pop()
+        return sum(counts[goal] for goal in self.goals)
+
+    def paths(self):
+        stack = [[goal] for goal in self.goals]
+        while len(stack) > 0:
+            path = stack.pop()
+            if path[-1] == self.start:
+                yield path[::-1]
+                continue
+            for previous in self.came_from[path[-1]]:
+                stack.append(path + [previous])
+
+    def __iter__(self):
+        return self.paths()
+
+    def __len__(self):
+        return self.count()
+
+
+class AStar:
+    def heuristic_cost_estimate(self, current, goal):
+        # Without an override the search runs as plain Dijkstra and skips calling this entirely
+        return 0
+
+    def distance_between(self, n1, n2):
+        raise NotImplementedError
+
+    def neighbors(self, node):
+        raise NotImplementedError
+
+    def is_goal_reached(self, current, goal):
+        return current == goal
+
+    def reconstruct_path(self, came_from, node, reversePath=False):
+        path = [node]
+        while came_from[node] is not None:
+            node = came_from[node]
+            path.append(node)
+        if not reversePath:
+            path.reverse()
+        return path
+
+    def astar(self, start, goal, reversePath=False, findAll=False):
+        if type(self).heuristic_cost_estimate is AStar.heuristic_cost_estimate:
+            heuristic = lambda current, goal: 0
+        else:
+            heuristic = self.heuristic_cost_estimate
+
+        # The heap is never updated in place. Improving a node pushes a new entry and the old one is
+        # skipped when popped because its cost no longer matches the best known cost.
+        counter = itertools.count()
+        best_cost = {start: 0}
+        came_from = {start: [] if findAll else None}
+        frontier = [(heuristic(start, goal), next(counter), 0, start)]
+        goals = []
+        goal_cost = None
+        while len(frontier) > 0:
+            estimate, _, cost, current = heapq.heappop(frontier)
+            if cost > best_cost[current]:
+                continue
+            if goal_cost is not None and estimate > goal_cost:
+                break
+            if self.is_goal_reached(current, goal):
+                if not findAll:
+                    return self.reconstruct_path(came_from, current, reversePath)
+                goal_cost = cost
+                goals.append(current)
+                continue
+            for neighbor in self.neighbors(current):
+                new_cost = cost + self.distance_between(current, neighbor)
+                old_cost = best_cost.get(neighbor)
+                if old_cost is None or new_cost < old_cost:
+                    best_cost[neighbor] = new_cost
+                    came_from[neighbor] = [current] if findAll else current
+                    heapq.heappush(frontier, (new_cost + heuristic(neighbor, goal), next(counter), new_cost, neighbor))
+                elif findAll and new_cost == old_cost:
+                    came_from[neighbor].append(current)
+
+        if len(goals) == 0:
+            return None
+        return PathDAG(start, goals, came_from, goal_cost)
@@ -0,0 +1,104 @@
+import heapq
+import itertools
+from collections import deque
+
+
+class SearchProblem:
+    def getStartState(self):
+        raise NotImplementedError
+
+    def isGoalState(self, state):
+        raise NotImplementedError
+
+    def getSuccessors(self, state):
+        # Should return a list of (successor, action, step_cost) triples
+        raise NotImplementedError
+
+    def getCostOfActions(self, actions):
+        raise NotImplementedError
+
+
+def nullHeuristic(state, problem=None):
+    return 0
+
+
+class Solution(list):
+    def __init__(self, actions, cost, state):
+        super(Solution, self).__init__(actions)
+        self.cost = cost
+        self.state = state
+
+
+# Search nodes are (state, parent, action) tuples. Only the parent pointer is stored per node and the
+# action list is rebuilt once a goal is found, rather than copying the path into every frontier entry.
+def get_solution(node, cost):
+    state = node[0]
+    actions = []
+    while node[1] is not None:
+        actions.append(node[2])
+        node = node[1]
+    actions.reverse()
+    return Solution(actions, cost, state)
+
+
+def _graph_search(problem, frontier, push, pop, find_all):
+    push(frontier, (problem.getStartState(), None, None), 0)
+    expanded = set()
+    solutions = []
+    while len(frontier) > 0:
+        node, cost = pop(frontier)
+        state = node[0]
+        if problem.isGoalState(state):
+            solution = get_solution(node, cost)
+            if not find_all:
+                return solution
+            solutions.append(solution)
+            continue
+        if state in expanded:
+            continue
+        expanded.add(state)
+        for successor, action, step_cost in problem.getSuccessors(state):
+            if successor not in expanded:
+                push(frontier, (successor, node, action), cost + step_cost)
+    return solutions if find_all else None
+
+
+def dfs(problem, find_all=False):
+    return _graph_search(problem, [], lambda stack, node, cost: stack.append((node, cost)), list.pop, find_all)
+
+
+def bfs(problem, find_all=False):
+    return _graph_search(problem, deque(), lambda queue, node, cost: queue.append((node, cost)), deque.popleft, find_all)
+
+
+def astar(problem, heuristic=nullHeuristic, find_all=False):
+    start = problem.getStartState()
+    # The counter breaks ties between equal priorities so states never need to be orderable
+    counter = itertools.count()
+    frontier = [(heuristic(start, problem), next(counter), 0, (start, None, None))]
+    best_cost = {start: 0}
+    solutions = []
+    while len(frontier) > 0:
+        _, _, cost, node = heapq.heappop(frontier)
+        state = node[0]
+        if cost > best_cost[state]:
+            # A cheaper way to this state was found after this entry was pushed
+            continue
+        if problem.isGoalState(state):
+            solution = get_solution(node, cost)
+            if not find_all:
+                return solution
+            solutions.append(solution)
+            continue
+        for successor, action, step_cost in problem.getSuccessors(state):
+            new_cost = cost + step_cost
+            old_cost = best_cost.get(successor)
+            # When finding all solutions, equally good paths to a state all have to be kept
+            if old_cost is None or new_cost < old_cost or (find_all and new_cost == old_cost):
+                best_cost[successor] = new_cost
+                heapq.heappush(frontier, (new_cost + heuristic(successor, problem), next(counter), new_cost, (successor, node, action)))
+    return solutions if find_all else None
+
+
+def ucs(problem, find_all=False):
+    return astar(problem, find_all=find_all)
@@ -1,13 +1,23 @@
 #!/usr/bin/env python3
 import argparse
-from aoc_util import dbg
+from aoc_util import dbg, parse_file, enable_parse_cache
 
 
-def problem(input_file, part2=False):
-    with open(input_file, 'r') as file:
-        for line in file:
-            line = line.strip()
-            pass
+# Parse the input once into a model that both parts share. Parts shouldn't modify the model,
+# anything they need to change should be copied first.
+def parse(file):
+    model = []
+    for line in file:
+        line = line.strip()
+        model.append(line)
+    return model
+
+
+def part1(model):
+    return None
+
+
+def part2(model):
     return None
 
 
@@ -15,9 +25,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('filename', nargs='?', default='input.txt')
     parser.add_argument('-v', '--verbose', action='count', default=0)
+    parser.add_argument('-c', '--cache', action='store_true', help='Reuse the parsed input from previous runs')
     args = parser.parse_args()
     dbg.set_level(args.verbose)
+    if args.cache:
+        enable_parse_cache()
 
-    print(problem(args.filename))
-    print(problem(args.filename, part2=True))
-
+    model = parse_file(parse, args.filename)
+    print(part1(model))
+    print(part2(model))
@@ -0,0 +1,17 @@
+import aoc
+
+
+def make_day(tmp_path, number, part1):
+    path = tmp_path / '2099' / f'Day{number:02}'
+    path.mkdir(parents=True)
+    (path / 'main.py').write_text(f'import os\n\ndef part1(input_file):\n    return {part1}\n\ndef part2(input_file):\n    return {number * 10}\n')
+    return aoc.Day(2099, number, str(path))
+
+
+def test_parallel_run_survives_crashed_worker(tmp_path):
+    days = [make_day(tmp_path, 1, '1'), make_day(tmp_path, 2, 'os._exit(1)'), make_day(tmp_path, 3, '3')]
+    results = {(result.day.day, result.part): result for result in aoc.run_parallel(days, 2)}
+    assert sorted(results) == [(1, 1), (1, 2), (2, 1), (2, 2), (3, 1), (3, 2)]
+    assert results[(2, 1)].error == 'Worker process died'
+    assert [results[(day, 2)].answer for day in (1, 2, 3)] == [10, 20, 30]
+    assert results[(1, 1)].answer == 1 and results[(3, 1)].answer == 3
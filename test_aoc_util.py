@@ -0,0 +1,146 @@
+import importlib
+import os
+import pickle
+import random
+import sys
+import pytest
+import aoc_util
+from aoc_util import Grid, Point, RangeSet
+
+
+def as_set(ranges):
+    return {value for start, stop in ranges for value in range(start, stop)}
+
+
+def test_split_at_stop():
+    below, above = RangeSet([(10, 20)]).split(20)
+    assert below == RangeSet([(10, 20)])
+    assert above == RangeSet()
+    assert len(above) == 0
+
+
+def test_split_at_start_and_inside():
+    ranges = RangeSet([(0, 5), (10, 20)])
+    assert ranges.split(10) == (RangeSet([(0, 5)]), RangeSet([(10, 20)]))
+    assert ranges.split(5) == (RangeSet([(0, 5)]), RangeSet([(10, 20)]))
+    assert ranges.split(15) == (RangeSet([(0, 5), (10, 15)]), RangeSet([(15, 20)]))
+
+
+def test_split_matches_sets():
+    rng = random.Random(0)
+    for _ in range(500):
+        ranges = [(start, start + rng.randint(1, 6)) for start in rng.sample(range(40), 4)]
+        values = as_set(ranges)
+        value = rng.randint(-2, 48)
+        below, above = RangeSet(ranges).split(value)
+        assert as_set(below) == {v for v in values if v < value}
+        assert as_set(above) == {v for v in values if v >= value}
+        # Every interval stays non-empty
+        assert all(start < stop for start, stop in below)
+        assert all(start < stop for start, stop in above)
+
+
+def make_cached_parse(tmp_path, monkeypatch, source):
+    # A parser whose model is a class from a module of its own, like a day using Grid or RangeSet
+    (tmp_path / 'shapes.py').write_text(source)
+    (tmp_path / 'input.txt').write_text('3\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(aoc_util, 'parse_cache_dir', str(tmp_path / 'cache'))
+    os.makedirs(aoc_util.parse_cache_dir)
+    calls = []
+
+    def parse(file):
+        calls.append(1)
+        import shapes
+        return shapes.Shape(int(file.read()))
+    return parse, str(tmp_path / 'input.txt'), calls
+
+
+def reload_shapes(tmp_path, source):
+    (tmp_path / 'shapes.py').write_text(source)
+    sys.modules.pop('shapes', None)
+    importlib.invalidate_caches()
+
+
+def test_parse_cache_hit(tmp_path, monkeypatch):
+    parse, input_file, calls = make_cached_parse(tmp_path, monkeypatch, 'class Shape:\n    def __init__(self, size):\n        self.size = size\n')
+    assert aoc_util.parse_file(parse, input_file).size == 3
+    assert aoc_util.parse_file(parse, input_file).size == 3
+    assert len(calls) == 1
+    sys.modules.pop('shapes')
+
+
+def test_parse_cache_misses_when_model_module_changes(tmp_path, monkeypatch):
+    parse, input_file, calls = make_cached_parse(tmp_path, monkeypatch, 'class Shape:\n    def __init__(self, size):\n        self.size = size\n')
+    aoc_util.parse_file(parse, input_file)
+    reload_shapes(tmp_path, 'class Shape:\n    def __init__(self, size):\n        self.size = size * 2\n')
+    assert aoc_util.parse_file(parse, input_file).size == 6
+    assert len(calls) == 2
+    sys.modules.pop('shapes')
+
+
+def test_parse_cache_survives_removed_class(tmp_path, monkeypatch):
+    parse, input_file, calls = make_cached_parse(tmp_path, monkeypatch, 'class Shape:\n    def __init__(self, size):\n        self.size = size\n')
+    # A stale entry holding a class from a module that's since been deleted
+    (tmp_path / 'gone.py').write_text('class Thing:\n    pass\n')
+    import gone
+    data = pickle.dumps(gone.Thing())
+    sys.modules.pop('gone')
+    os.remove(tmp_path / 'gone.py')
+    importlib.invalidate_caches()
+    path = os.path.join(aoc_util.parse_cache_dir, f'{aoc_util.parse_cache_key(parse, input_file)}.pickle')
+    with open(path, 'wb') as file:
+        pickle.dump(({}, data), file)
+
+    assert aoc_util.parse_file(parse, input_file).size == 3
+    assert len(calls) == 1
+    # The bad entry was replaced by the fresh model
+    assert aoc_util.parse_file(parse, input_file).size == 3
+    assert len(calls) == 1
+    sys.modules.pop('shapes')
+
+
+def test_grid_round_trip():
+    rows = ['#..', '.^.', '..#']
+    grid = Grid(rows)
+    assert str(grid) == '\n'.join(rows)
+    assert grid.at(Point(1, 1)) == '^'
+    assert grid.at(Point(3, 0)) is None
+    assert grid.point(grid.find('^')) == Point(1, 1)
+
+
+def test_grid_rejects_ragged_rows():
+    with pytest.raises(ValueError):
+        Grid(['#..', '.^', '..#'])
+
+
+def random_ranges(rng):
+    return [(start, start + rng.randint(1, 6)) for start in rng.sample(range(40), rng.randint(0, 5))]
+
+
+def test_difference_matches_sets():
+    rng = random.Random(1)
+    for _ in range(500):
+        a, b = random_ranges(rng), random_ranges(rng)
+        result = RangeSet(a) - RangeSet(b)
+        assert as_set(result) == as_set(a) - as_set(b)
+        assert result == RangeSet(result)
+
+
+def test_map_matches_sets():
+    rng = random.Random(2)
+    for _ in range(500):
+        ranges = random_ranges(rng)
+        # Pieces that don't overlap, in no particular order
+        cuts = sorted(rng.sample(range(-2, 50), 2 * rng.randint(0, 4)))
+        pieces = [(cuts[i], cuts[i+1], rng.randint(-20, 20)) for i in range(0, len(cuts), 2)]
+        rng.shuffle(pieces)
+
+        def move(value):
+            for start, stop, offset in pieces:
+                if start <= value < stop:
+                    return value + offset
+            return value
+        result = RangeSet(ranges).map(pieces)
+        assert as_set(result) == {move(value) for value in as_set(ranges)}
+        assert result == RangeSet(result)